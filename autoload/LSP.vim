@@ -14,15 +14,146 @@ endfunction
 " The main difference with getbufline is that it checks fixendofline settings
 " and add extra line at ending if appropriate.
 function! LSP#text(...) abort
-    let l:buf = get(a:000, 0, '')
+    return s:text(get(a:000, 0, ''), 0)
+endfunction
 
-    let l:lines = getbufline(l:buf, 1, '$')
-    if len(l:lines) > 0 && l:lines[-1] !=# '' && &fixendofline
+" Lines of LSP#text(buf) from line start (0-based).
+function! s:text(buf, start) abort
+    let l:lines = getbufline(a:buf, a:start + 1, '$')
+    let l:last = getbufline(a:buf, '$')
+    if len(l:last) > 0 && l:last[0] !=# '' && &fixendofline
         let l:lines += ['']
     endif
     return l:lines
 endfunction
 
+" Lines changed in every tracked buffer since LSP#textChanges last returned
+" them, by bufnr: lines [start, end) of the current text replace lines
+" [start, end - delta) of the text at changedtick, which had linecount lines.
+" start is v:null while nothing changed.
+let s:changes = {}
+
+" Lines of buffer buf changed since b:changedtick was `since`, as a dict with
+" the keys changedtick, start, end and lines: lines replace the lines start to
+" end (exclusive, v:null for the end of the text) of LSP#text(buf) at `since`.
+" If the changes since then aren't known, e.g. on the first call for buf or
+" when `since` is v:null, the whole text is returned with start 0 and end
+" v:null.
+function! LSP#textChanges(buf, since) abort
+    let l:bufnr = bufnr(a:buf)
+    if l:bufnr == -1
+        return {'changedtick': 0, 'start': 0, 'end': v:null, 'lines': LSP#text(a:buf)}
+    endif
+    let l:changedtick = getbufvar(l:bufnr, 'changedtick')
+
+    if exists('*listener_flush')
+        call listener_flush(l:bufnr)
+    endif
+    let l:linecount = s:linecount(l:bufnr)
+    let l:changes = get(s:changes, l:bufnr, v:null)
+    if l:changes isnot v:null || s:TrackChanges(l:bufnr)
+        let s:changes[l:bufnr] = {
+                    \ 'changedtick': l:changedtick,
+                    \ 'linecount': l:linecount,
+                    \ 'start': v:null,
+                    \ 'end': 0,
+                    \ 'delta': 0,
+                    \ }
+    endif
+
+    " Deleting every line is reported as leaving none, while an empty line
+    " is left: check the changes add up before trusting them.
+    if l:changes is v:null || l:changes.changedtick isnot a:since
+                \ || l:changes.linecount + l:changes.delta != l:linecount
+        return {'changedtick': l:changedtick, 'start': 0, 'end': v:null, 'lines': LSP#text(a:buf)}
+    elseif l:changes.start is v:null
+        return {'changedtick': l:changedtick, 'start': 0, 'end': 0, 'lines': []}
+    elseif l:changes.end >= l:linecount
+        " Up to the end of the text, as the line LSP#text adds for
+        " 'fixendofline' may have changed too.
+        return {
+                    \ 'changedtick': l:changedtick,
+                    \ 'start': l:changes.start,
+                    \ 'end': v:null,
+                    \ 'lines': s:text(a:buf, l:changes.start),
+                    \ }
+    endif
+    return {
+                \ 'changedtick': l:changedtick,
+                \ 'start': l:changes.start,
+                \ 'end': l:changes.end - l:changes.delta,
+                \ 'lines': getbufline(l:bufnr, l:changes.start + 1, l:changes.end),
+                \ }
+endfunction
+
+function! s:linecount(bufnr) abort
+    if a:bufnr == bufnr('')
+        return line('$')
+    endif
+    let l:info = getbufinfo(a:bufnr)[0]
+    return has_key(l:info, 'linecount') ? l:info.linecount : len(getbufline(a:bufnr, 1, '$'))
+endfunction
+
+" Starts calling LSP#onLines on every change to bufnr. Returns whether
+" changes can be tracked.
+function! s:TrackChanges(bufnr) abort
+    if exists('*listener_add')
+        let l:id = listener_add(function('s:OnListener'), a:bufnr)
+        augroup LSP_textChanges
+            execute 'autocmd! BufUnload <buffer=' . a:bufnr . '>'
+            execute 'autocmd BufUnload <buffer=' . a:bufnr . '> call listener_remove(' . l:id . ') | call LSP#onDetach(' . a:bufnr . ')'
+        augroup END
+        return v:true
+    elseif has('nvim-0.4')
+        return luaeval('vim.api.nvim_buf_attach(_A, false, {'
+                    \ . 'on_lines = function(_, buf, tick, first, last, new_last) '
+                    \ . 'vim.api.nvim_call_function("LSP#onLines", {buf, first, last, new_last}) end, '
+                    \ . 'on_reload = function(_, buf) vim.api.nvim_call_function("LSP#onReload", {buf}) end, '
+                    \ . 'on_detach = function(_, buf) vim.api.nvim_call_function("LSP#onDetach", {buf}) end})',
+                    \ a:bufnr)
+    endif
+    return v:false
+endfunction
+
+function! s:OnListener(bufnr, start, end, added, changes) abort
+    " Vim flushes the changes before recording one that would move the lines
+    " of those already recorded, they can be applied in order.
+    for l:change in a:changes
+        call LSP#onLines(a:bufnr, l:change.lnum - 1, l:change.end - 1, l:change.end - 1 + l:change.added)
+    endfor
+endfunction
+
+" Lines [first, last) of buffer bufnr were replaced by lines [first, new_last).
+function! LSP#onLines(bufnr, first, last, new_last) abort
+    let l:changes = get(s:changes, a:bufnr, v:null)
+    if l:changes is v:null
+        return
+    endif
+
+    if l:changes.start is v:null
+        let l:changes.start = a:first
+        let l:changes.end = a:new_last
+    else
+        let l:changes.start = min([l:changes.start, a:first])
+        let l:changes.end = max([l:changes.end, a:last]) + a:new_last - a:last
+    endif
+    let l:changes.delta += a:new_last - a:last
+endfunction
+
+" The changes to bufnr are no longer known, the next LSP#textChanges returns
+" the whole text.
+function! LSP#onReload(bufnr) abort
+    if has_key(s:changes, a:bufnr)
+        let s:changes[a:bufnr].changedtick = -1
+    endif
+endfunction
+
+function! LSP#onDetach(bufnr) abort
+    if has_key(s:changes, a:bufnr)
+        unlet s:changes[a:bufnr]
+    endif
+endfunction
+
 function! LSP#line() abort
     return line('.') - 1
 endfunction
@@ -607,6 +607,7 @@ endfunction
 
 let s:id = 1
 let s:handlers = {}
+let s:lastRequest = {}
 
 " Note: vim execute callback for every line.
 let s:content_length = 0
@@ -681,6 +682,10 @@ function! s:HandleMessage(job, lines, event) abort
                 endtry
             elseif has_key(l:message, 'result') || has_key(l:message, 'error')
                 let l:id = get(l:message, 'id')
+                if !has_key(s:handlers, l:id)
+                    " Cancelled, see s:CancelRequest.
+                    continue
+                endif
                 let l:Handle = get(s:handlers, l:id)
                 unlet s:handlers[l:id]
                 let l:type = type(l:Handle)
@@ -854,6 +859,7 @@ function! LanguageClient#Call(method, params, callback, ...) abort
 
     let l:id = s:id
     let s:id = s:id + 1
+    let s:lastRequest = {'id': l:id, 'method': a:method}
     if a:callback is v:null
         let s:handlers[l:id] = function('s:HandleOutput')
     else
@@ -972,7 +978,6 @@ function! LanguageClient#textDocument_references(...) abort
     let l:Callback = get(a:000, 1, v:null)
     let l:params = {
                 \ 'filename': LSP#filename(),
-                \ 'text': LSP#text(),
                 \ 'line': LSP#line(),
                 \ 'character': LSP#character(),
                 \ 'includeDeclaration': v:true,
@@ -1001,7 +1006,6 @@ function! LanguageClient#textDocument_documentSymbol(...) abort
     let l:Callback = get(a:000, 1, v:null)
     let l:params = {
                 \ 'filename': LSP#filename(),
-                \ 'text': LSP#text(),
                 \ 'handle': s:IsFalse(l:Callback),
                 \ }
     call extend(l:params, get(a:000, 0, {}))
@@ -1012,7 +1016,6 @@ function! LanguageClient#workspace_symbol(...) abort
     let l:Callback = get(a:000, 2, v:null)
     let l:params = {
                 \ 'filename': LSP#filename(),
-                \ 'text': LSP#text(),
                 \ 'query': get(a:000, 0, ''),
                 \ 'handle': s:IsFalse(l:Callback),
                 \ }
@@ -1034,7 +1037,7 @@ function! LanguageClient#textDocument_codeLens(...) abort
 endfunction
 
 function! s:do_codeAction(mode, ...) abort
-    let l:Callback = get(a:000, 2, v:null)
+    let l:Callback = get(a:000, 1, v:null)
     let l:params = {
                 \ 'filename': LSP#filename(),
                 \ 'line': LSP#line(),
@@ -1042,16 +1045,25 @@ function! s:do_codeAction(mode, ...) abort
                 \ 'handle': s:IsFalse(l:Callback),
                 \ 'range': LSP#range(a:mode),
                 \ }
-    call extend(l:params, get(a:000, 1, {}))
+    call extend(l:params, get(a:000, 0, {}))
     return LanguageClient#Call('textDocument/codeAction', l:params, l:Callback)
 endfunction
 
 function! LanguageClient#textDocument_visualCodeAction(...) range abort
-  call s:do_codeAction('v', a:000)
+  return call('s:do_codeAction', ['v'] + a:000)
 endfunction
 
 function! LanguageClient#textDocument_codeAction(...) abort
-  call s:do_codeAction('n', a:000)
+  return call('s:do_codeAction', ['n'] + a:000)
+endfunction
+
+" Applies a code action as returned by textDocument/codeAction, fetching its
+" edit first if the server deferred it.
+function! LanguageClient#applyCodeAction(action) abort
+  return LanguageClient#Notify('languageClient/applyCodeAction', {
+              \ 'filename': LSP#filename(),
+              \ 'action': a:action,
+              \ })
 endfunction
 
 function! LanguageClient#executeCodeAction(kind, ...) abort
@@ -1239,17 +1251,144 @@ function! s:ExecuteAutocmd(event) abort
     endif
 endfunction
 
+" Calls fn, which must send a single request with LanguageClient#Call, and
+" returns the request ({'id', 'method', 'deadline'}), or v:null if fn didn't
+" send any (e.g. no server for the filetype).
+function! s:StartRequest(fn, arguments) abort
+    let l:lastId = s:id
+    call call(a:fn, a:arguments)
+    if s:id == l:lastId
+        return v:null
+    endif
+
+    let l:request = copy(s:lastRequest)
+    let l:timeout = get(g:, 'LanguageClient_syncTimeout', 30)
+    if type(l:timeout) == s:TYPE.dict
+        let l:timeout = get(l:timeout, l:request.method, get(l:timeout, '*', 30))
+    endif
+    let l:request.timeout = l:timeout
+    let l:request.start = reltime()
+    return l:request
+endfunction
+
+function! s:RequestTimedOut(request) abort
+    return a:request.timeout > 0
+                \ && reltimefloat(reltime(a:request.start)) >= a:request.timeout
+endfunction
+
+" Drops the handler of request and asks the server to stop working on it.
+function! s:CancelRequest(request) abort
+    if has_key(s:handlers, a:request.id)
+        unlet s:handlers[a:request.id]
+    endif
+    " Written directly as the current buffer may have no server (e.g. the
+    " denite buffer), the request isn't tied to it.
+    call LanguageClient#Write(json_encode({
+                \ 'jsonrpc': '2.0',
+                \ 'method': '$/cancelRequest',
+                \ 'params': {'id': a:request.id},
+                \ }))
+endfunction
+
 function! LanguageClient_runSync(fn, ...) abort
     let l:LanguageClient_runSync_outputs = []
     let l:arguments = add(a:000[:], l:LanguageClient_runSync_outputs)
-    call call(a:fn, l:arguments)
-    while len(l:LanguageClient_runSync_outputs) == 0
-        sleep 100m
-    endwhile
+    let l:request = s:StartRequest(a:fn, l:arguments)
+    if l:request is v:null
+        return v:null
+    endif
+
+    try
+        while len(l:LanguageClient_runSync_outputs) == 0
+            if s:RequestTimedOut(l:request)
+                call s:CancelRequest(l:request)
+                call s:Echowarn(l:request.method . ' timed out after ' . string(l:request.timeout) . 's')
+                return v:null
+            endif
+            sleep 100m
+        endwhile
+    catch /^Vim:Interrupt$/
+        call s:CancelRequest(l:request)
+        return v:null
+    endtry
     let l:output = remove(l:LanguageClient_runSync_outputs, 0)
     return s:HandleOutput(l:output, v:true)
 endfunction
 
+" Requests started with LanguageClient_runStreaming, by partialResultToken.
+let s:streams = {}
+let s:streamsId = 0
+
+" Like LanguageClient_runSync, but returns right away with a token to pass to
+" LanguageClient_takePartialResults. The last argument must be the params of
+" fn, the token is added to them so that servers supporting partial results
+" stream the result in chunks.
+function! LanguageClient_runStreaming(fn, ...) abort
+    let s:streamsId += 1
+    let l:token = 'LanguageClient_stream_' . s:streamsId
+    let l:stream = {'chunks': [], 'outputs': []}
+    let s:streams[l:token] = l:stream
+
+    let l:arguments = a:000[:]
+    let l:arguments[-1] = extend({'partialResultToken': l:token}, l:arguments[-1])
+    let l:stream.request = s:StartRequest(a:fn, add(l:arguments, l:stream.outputs))
+    if l:stream.request is v:null
+        unlet s:streams[l:token]
+    endif
+    return l:token
+endfunction
+
+" Returns the items received for token since the last call, and whether the
+" request is done. Past the deadline of g:LanguageClient_syncTimeout the
+" request is cancelled and reported as done, with an error message.
+function! LanguageClient_takePartialResults(token) abort
+    let l:stream = get(s:streams, a:token, v:null)
+    if l:stream is v:null
+        return {'items': [], 'done': v:true}
+    endif
+
+    let l:items = []
+    for l:chunk in l:stream.chunks
+        call extend(l:items, l:chunk)
+    endfor
+    let l:stream.chunks = []
+
+    if !empty(l:stream.outputs)
+        unlet s:streams[a:token]
+        let l:result = s:HandleOutput(remove(l:stream.outputs, 0), v:true)
+        if type(l:result) == s:TYPE.list
+            call extend(l:items, l:result)
+        endif
+        return {'items': l:items, 'done': v:true}
+    elseif s:RequestTimedOut(l:stream.request)
+        unlet s:streams[a:token]
+        call s:CancelRequest(l:stream.request)
+        return {
+                    \ 'items': l:items,
+                    \ 'done': v:true,
+                    \ 'error': l:stream.request.method . ' timed out after ' . string(l:stream.request.timeout) . 's',
+                    \ }
+    endif
+    return {'items': l:items, 'done': v:false}
+endfunction
+
+" Cancels the request of token, if it isn't done yet.
+function! LanguageClient_cancelStreaming(token) abort
+    let l:stream = get(s:streams, a:token, v:null)
+    if l:stream isnot v:null
+        unlet s:streams[a:token]
+        call s:CancelRequest(l:stream.request)
+    endif
+endfunction
+
+function! s:HandlePartialResult(token, chunk) abort
+    " Chunks of requests already done or not started by
+    " LanguageClient_runStreaming are dropped.
+    if has_key(s:streams, a:token)
+        call add(s:streams[a:token].chunks, a:chunk)
+    endif
+endfunction
+
 function! LanguageClient#handleBufNewFile() abort
     try
         call LanguageClient#Notify('languageClient/handleBufNewFile', {
@@ -1461,9 +1600,6 @@ endfunction
 let g:LanguageClient_completeResults = []
 function! LanguageClient#complete(findstart, base) abort
     if a:findstart
-        " Before requesting completion, content between l:start and current cursor is removed.
-        let s:completeText = LSP#text()
-
         let l:input = getline('.')[:LSP#character() - 1]
         let l:start = LanguageClient#get_complete_start(l:input)
         return l:start
@@ -1473,7 +1609,6 @@ function! LanguageClient#complete(findstart, base) abort
                     \ 'LanguageClient#omniComplete', {
                     \ 'character': LSP#character() + len(a:base),
                     \ 'complete_position': LSP#character(),
-                    \ 'text': s:completeText,
                     \ })
         let l:result = l:result is v:null ? [] : l:result
         let l:filtered_items = []
@@ -1550,6 +1685,28 @@ function! LanguageClient#isServerRunning() abort
     return get(b:, 'LanguageClient_isServerRunning', 0)
 endfunction
 
+" Snapshot of everything the denite/deoplete sources need to know about the
+" editor, so that they get it in a single call. Describes buffer bufnr, the
+" current buffer by default, and the cursor of the current window.
+function! LanguageClient#editorContext(...) abort
+    let l:bufnr = get(a:000, 0, bufnr(''))
+    let l:bufname = bufname(l:bufnr)
+    let l:filetype = getbufvar(l:bufnr, '&filetype')
+    return {
+                \ 'cwd': getcwd(),
+                \ 'bufnr': l:bufnr,
+                \ 'currentBufnr': bufnr(''),
+                \ 'filename': l:bufname ==# '' ? '' : fnamemodify(l:bufname, ':p'),
+                \ 'filetype': l:filetype,
+                \ 'changedtick': getbufvar(l:bufnr, 'changedtick'),
+                \ 'line': LSP#line(),
+                \ 'character': LSP#character(),
+                \ 'hasServer': has_key(getbufvar(l:bufnr, 'LanguageClient_serverCommands',
+                \     get(g:, 'LanguageClient_serverCommands', {})), l:filetype),
+                \ 'serverRunning': getbufvar(l:bufnr, 'LanguageClient_isServerRunning', 0),
+                \ }
+endfunction
+
 " Example function usable for status line.
 function! LanguageClient#statusLine() abort
     if g:LanguageClient_serverStatusMessage ==# ''
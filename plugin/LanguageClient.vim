@@ -38,6 +38,10 @@ function! LanguageClient_textDocument_codeAction(...)
     return call('LanguageClient#textDocument_codeAction', a:000)
 endfunction
 
+function! LanguageClient_applyCodeAction(...)
+    return call('LanguageClient#applyCodeAction', a:000)
+endfunction
+
 function! LanguageClient_textDocument_codeLens(...)
     return call('LanguageClient#textDocument_codeLens', a:000)
 endfunction
@@ -106,6 +110,10 @@ function! LanguageClient_isServerRunning(...)
     return call('LanguageClient#isServerRunning', a:000)
 endfunction
 
+function! LanguageClient_editorContext(...)
+    return call('LanguageClient#editorContext', a:000)
+endfunction
+
 function! LanguageClient_statusLine(...)
     return call('LanguageClient#statusLine', a:000)
 endfunction
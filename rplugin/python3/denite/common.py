@@ -1,14 +1,16 @@
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from os.path import dirname, relpath
 from urllib import request, parse
 import sys
+import threading
+import time
 from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from denite.source.base import Base
 
-sys.path.insert(0, dirname(__file__))
-
-from lsp.protocol import SymbolKind  # isort:skip  # noqa: I100 E402
+if dirname(__file__) not in sys.path:
+    sys.path.insert(0, dirname(__file__))
 
 
 MAX_FNAME_LEN = 30
@@ -111,14 +113,172 @@ def highlight_setup(source: Base, syntax: List[HighlightDefinition]) -> None:
                     source.syntax_name, hl_def.name, hl_def.link))
 
 
+NO_SERVER_MESSAGE = 'No language server running for this buffer.'
+
+
+def editor_context(vim, context: Dict) -> Dict:
+    """LanguageClient#editorContext of the buffer denite was started from.
+    Taken once and kept in the denite context, sources read cwd, buffer and
+    server state from it instead of asking vim for each."""
+    if '__editor' not in context:
+        context['__editor'] = vim.funcs.LanguageClient_editorContext(
+            context['bufnr'])
+    return context['__editor']
+
+
+def start_streaming(vim, context: Dict, fn: str, *args) -> None:
+    """Start fn with LanguageClient_runStreaming and make the source
+    asynchronous, take_partial_results then returns the items as they
+    arrive. Denite is never blocked waiting for the server."""
+    context['__stream'] = vim.funcs.LanguageClient_runStreaming(fn, *args)
+    context['is_async'] = True
+
+
+def take_partial_results(source: Base, context: Dict) -> List[Dict]:
+    if '__stream' not in context:
+        # Done, only the conversion of the last items may be left.
+        return []
+    results = source.vim.funcs.LanguageClient_takePartialResults(
+        context['__stream'])
+    context['is_async'] = not results['done']
+    if results['done']:
+        del context['__stream']
+    if 'error' in results:
+        # Timed out, the items received so far are all there is.
+        source.print_message(context, results['error'])
+    return results['items']
+
+
+# Responses with more items than this are converted to candidates on a
+# worker thread, CONVERSION_CHUNK_SIZE items at a time, so that the other
+# sources sharing the remote plugin host (deoplete completion in particular)
+# keep running meanwhile.
+BACKGROUND_CONVERSION_THRESHOLD = 2000
+CONVERSION_CHUNK_SIZE = 500
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _conversion_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        # A single worker runs the batches of every conversion in the order
+        # they were submitted.
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='LanguageClient-convert')
+    return _executor
+
+
+class Conversion:
+    """Candidates converted on the worker thread, taken by the source as
+    they become ready. The worker must not call into vim."""
+
+    def __init__(self, convert: Callable[..., List[Dict]], *args) -> None:
+        self.convert = convert
+        self.args = args
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.candidates: List[Dict] = []
+        self.pending: List[Future] = []
+
+    def submit(self, items: List[Dict]) -> None:
+        self.pending.append(
+            _conversion_executor().submit(self._run, items))
+
+    def _run(self, items: List[Dict]) -> None:
+        for start in range(0, len(items), CONVERSION_CHUNK_SIZE):
+            if self.cancelled.is_set():
+                return
+            candidates = self.convert(
+                items[start:start + CONVERSION_CHUNK_SIZE], *self.args)
+            with self.lock:
+                self.candidates += candidates
+            # Give the host thread the interpreter between chunks.
+            time.sleep(0)
+
+    def done(self) -> bool:
+        finished = [f for f in self.pending if f.done()]
+        self.pending = [f for f in self.pending if f not in finished]
+        for future in finished:
+            if future.exception() is not None:
+                # Raise errors of the worker in the source, once: the
+                # batches queued behind the failed one are dropped.
+                self.cancel()
+                self.pending = []
+                future.result()
+        return not self.pending
+
+    def take(self) -> List[Dict]:
+        with self.lock:
+            candidates, self.candidates = self.candidates, []
+        return candidates
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+
+def convert_candidates(context: Dict, convert: Callable[..., List[Dict]],
+                       items: List[Dict], *args) -> List[Dict]:
+    """convert(items, *args), on the worker thread if there are more than
+    BACKGROUND_CONVERSION_THRESHOLD items. Items of later calls are queued
+    behind a running conversion to keep them in order. The source is kept
+    asynchronous until every candidate has been returned and the stream
+    started by start_streaming, if any, is done."""
+    conversion = context.get('__conversion')
+    if conversion is None:
+        if len(items) <= BACKGROUND_CONVERSION_THRESHOLD:
+            return convert(items, *args)
+        conversion = context['__conversion'] = Conversion(convert, *args)
+    if items:
+        conversion.submit(items)
+
+    # Whatever the worker converts after done() is taken on the next call.
+    try:
+        done = conversion.done()
+    except Exception:
+        del context['__conversion']
+        context['is_async'] = '__stream' in context
+        raise
+    candidates = conversion.take()
+    if done:
+        del context['__conversion']
+    context['is_async'] = not done or '__stream' in context
+    return candidates
+
+
+def stop(vim, context: Dict) -> None:
+    """Cancel the request and the conversion running for context, e.g. once
+    the denite buffer is closed."""
+    if '__stream' in context:
+        vim.funcs.LanguageClient_cancelStreaming(context.pop('__stream'))
+    conversion = context.pop('__conversion', None)
+    if conversion is not None:
+        conversion.cancel()
+
+
+def column_widths(context: Dict) -> Dict[str, int]:
+    """Widths of the columns of the candidates of context, kept across the
+    chunks converted by convert_symbols_to_candidates. They only grow, and
+    candidates already returned to denite keep the padding of their chunk:
+    the columns of a result converted in several chunks may not line up."""
+    return context.setdefault('__widths', {'path': 0, 'kind': 0})
+
+
 def convert_symbols_to_candidates(symbols: List[Dict],
                                   bufname: str = None,
-                                  pwd: str = None) -> List[Dict]:
+                                  pwd: str = None,
+                                  widths: Dict[str, int] = None) -> List[Dict]:
+    """Symbols converted to candidates, with their location and kind padded
+    to the widest seen so far in widths (see column_widths)."""
+    from lsp.protocol import SymbolKind  # isort:skip  # noqa: I100
+
     candidates = []
     paths = []
     kinds = []
-    max_path_len = 0
-    max_kind_len = 0
+    if widths is None:
+        widths = {'path': 0, 'kind': 0}
+    max_path_len = widths['path']
+    max_kind_len = widths['kind']
     for symbol in symbols:
         name = symbol["name"]
         start = symbol["location"]["range"]["start"]
@@ -147,6 +307,8 @@ def convert_symbols_to_candidates(symbols: List[Dict],
             "action__col": character,
         })
 
+    widths['path'] = max_path_len
+    widths['kind'] = max_kind_len
     for candidate, path, kind in zip(candidates, paths, kinds):
         candidate["abbr"] = "{:<{}} [{:^{}}] {}".format(
             path,
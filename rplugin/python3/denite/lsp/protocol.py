@@ -42,14 +42,26 @@ class SymbolKind(IntEnum):
         return SymbolKind.Unknown
 
     def describe(self):
-        return self._pprint_map[self]
+        return _pprint_map()[self]
 
 
-SymbolKind._pprint_map = {}
-for e in SymbolKind:
-    if e == SymbolKind.Unknown:
-        s = ""
-    else:
-        s = re.sub("([a-z])([A-Z])", r"\g<1> \g<2>", str(e).split(".", 1)[1])
+_PPRINT_MAP = None
 
-    SymbolKind._pprint_map[int(e)] = s
+
+def _pprint_map():
+    # Built on first use rather than at import time, so loading the denite
+    # sources does not pay for the regex pass over every member. Candidates
+    # are converted on a worker thread too: the map is only published once
+    # complete.
+    global _PPRINT_MAP
+    if _PPRINT_MAP is None:
+        pprint_map = {}
+        for e in SymbolKind:
+            if e == SymbolKind.Unknown:
+                s = ""
+            else:
+                s = re.sub("([a-z])([A-Z])", r"\g<1> \g<2>", e.name)
+
+            pprint_map[int(e)] = s
+        _PPRINT_MAP = pprint_map
+    return _PPRINT_MAP
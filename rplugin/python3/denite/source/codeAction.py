@@ -1,24 +1,62 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Tuple
+from os.path import dirname
+import json
+import sys
+
 from .base import Base
 
 
+def import_common():
+    # See documentSymbol.import_common.
+    common_path = dirname(dirname(__file__))
+    if common_path not in sys.path:
+        sys.path.insert(0, common_path)
+
+    import common  # isort:skip  # noqa: I100
+    return common
+
+
 class Source(Base):
     def __init__(self, vim):
         super().__init__(vim)
 
         self.name = 'codeAction'
         self.kind = 'command'
+        # Actions listed at (bufnr, changedtick, line, character), so that
+        # reopening the picker without editing doesn't ask the server again.
+        self.cache: Dict[Tuple[Any, ...], List[Dict]] = {}
 
     def gather_candidates(self, context: Dict) -> List[Dict]:
-        result = self.vim.funcs.LanguageClient_runSync(
-            'LanguageClient_textDocument_codeAction', {}) or []
-        return [convert_to_candidate(item) for item in result]
+        common = import_common()
+        editor = common.editor_context(self.vim, context)
+        if not editor['serverRunning']:
+            self.print_message(context, common.NO_SERVER_MESSAGE)
+            return []
+
+        key = (editor['bufnr'], editor['changedtick'], editor['line'],
+               editor['character'])
+        if key not in self.cache:
+            result = self.vim.funcs.LanguageClient_runSync(
+                'LanguageClient_textDocument_codeAction', {})
+            if result is None:
+                # Failed or timed out, try again next time. The reason was
+                # echoed by runSync, hidden behind the denite buffer.
+                self.print_message(
+                    context, 'textDocument/codeAction failed or timed out.')
+                return []
+            self.cache = {key: result}
+        return [convert_to_candidate(item) for item in self.cache[key]]
 
 
-def convert_to_candidate(cmd: Dict) -> Dict:
-    cmd_str = '{}: {}'.format(cmd['command'], cmd['title'])
+def convert_to_candidate(action: Dict) -> Dict:
+    # Only the title is shown. Servers supporting codeAction/resolve send the
+    # edit of the selected action once it is applied.
+    if isinstance(action.get('command'), str):
+        kind = action['command']
+    else:
+        kind = action.get('kind') or 'action'
     return {
-        'word': cmd_str,
-        'action__command': 'call '
-        'LanguageClient_FZFSinkCommand("{}")'.format(cmd_str),
+        'word': '{}: {}'.format(kind, action['title']),
+        'action__command': "call LanguageClient_applyCodeAction("
+        "json_decode('{}'))".format(json.dumps(action).replace("'", "''")),
     }
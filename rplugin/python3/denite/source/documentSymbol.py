@@ -4,13 +4,16 @@ import sys
 
 from .base import Base
 
-sys.path.insert(0, dirname(dirname(__file__)))
 
-from common import (  # isort:skip  # noqa: I100 E402
-    convert_symbols_to_candidates,
-    SYMBOL_CANDIDATE_HIGHLIGHT_SYNTAX,
-    highlight_setup,
-)
+def import_common():
+    # Deferred until first use so that loading the source into the remote
+    # plugin host doesn't touch sys.path or import the LSP protocol tables.
+    common_path = dirname(dirname(__file__))
+    if common_path not in sys.path:
+        sys.path.insert(0, common_path)
+
+    import common  # isort:skip  # noqa: I100
+    return common
 
 
 class Source(Base):
@@ -20,11 +23,25 @@ class Source(Base):
         self.name = 'documentSymbol'
         self.kind = 'file'
 
+    def on_close(self, context):
+        import_common().stop(self.vim, context)
+
     def highlight(self):
-        highlight_setup(self, SYMBOL_CANDIDATE_HIGHLIGHT_SYNTAX)
+        common = import_common()
+        common.highlight_setup(self, common.SYMBOL_CANDIDATE_HIGHLIGHT_SYNTAX)
 
     def gather_candidates(self, context: Dict) -> List[Dict]:
-        bufname = self.vim.current.buffer.name
-        result = self.vim.funcs.LanguageClient_runSync(
-            'LanguageClient_textDocument_documentSymbol', {}) or []
-        return convert_symbols_to_candidates(result, bufname)
+        common = import_common()
+        editor = common.editor_context(self.vim, context)
+        if not context['is_async']:
+            if not editor['serverRunning']:
+                self.print_message(context, common.NO_SERVER_MESSAGE)
+                return []
+            common.start_streaming(
+                self.vim, context,
+                'LanguageClient_textDocument_documentSymbol', {})
+
+        return common.convert_candidates(
+            context, common.convert_symbols_to_candidates,
+            common.take_partial_results(self, context), editor['filename'],
+            None, common.column_widths(context))
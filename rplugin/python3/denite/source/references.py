@@ -1,6 +1,7 @@
 from urllib import request, parse
 from os import path
 from typing import List, Dict
+import sys
 
 from .base import Base
 
@@ -29,6 +30,16 @@ def uri_to_path(uri: str) -> str:
     return request.url2pathname(parse.urlparse(uri).path)
 
 
+def import_common():
+    # See documentSymbol.import_common.
+    common_path = path.dirname(path.dirname(__file__))
+    if common_path not in sys.path:
+        sys.path.insert(0, common_path)
+
+    import common  # isort:skip  # noqa: I100
+    return common
+
+
 class Source(Base):
     def __init__(self, vim):
         super().__init__(vim)
@@ -37,6 +48,21 @@ class Source(Base):
         self.name = 'references'
         self.kind = 'file'
 
+    def on_init(self, context):
+        # :Denite references:grouped[:count|:path] lists files with their
+        # number of references instead of every reference, selecting files
+        # expands them into a references:file session given their locations.
+        if context['args'][:1] == ['grouped']:
+            self.kind = make_grouped_kind(self.vim, context)
+        else:
+            self.kind = 'file'
+
+    def on_close(self, context):
+        # The locations of a grouped session stay in its context: denite
+        # closes the buffer before running the expand action. They go with
+        # the session.
+        import_common().stop(self.vim, context)
+
     def define_syntax(self):
         self.vim.command(
             'syntax region ' + self.syntax_name + ' start=// end=/$/ '
@@ -57,9 +83,9 @@ class Source(Base):
         self.vim.command(GREP_LINE_HIGHLIGHT)
         self.vim.command(GREP_PATTERNS_HIGHLIGHT)
 
-    def convert_to_candidates(self, locations: List[Dict]) -> List[Dict]:
+    def convert_to_candidates(self, locations: List[Dict],
+                              pwd: str) -> List[Dict]:
         candidates = []
-        pwd = self.vim.funcs.getcwd()
         for loc in locations:
             filepath = uri_to_path(loc["uri"])
             relpath = path.relpath(filepath, pwd)
@@ -82,7 +108,100 @@ class Source(Base):
 
         return candidates
 
+    def convert_to_groups(self, locations: List[Dict], order: str, pwd: str,
+                          groups: Dict[str, List[Dict]]) -> List[Dict]:
+        """Candidates of the files of locations, filling groups with their
+        locations by file path."""
+        by_uri: Dict[str, List[Dict]] = {}
+        for loc in locations:
+            by_uri.setdefault(loc["uri"], []).append(loc)
+
+        candidates = []
+        for uri, locs in by_uri.items():
+            locs.sort(key=lambda loc: (loc["range"]["start"]["line"],
+                                       loc["range"]["start"]["character"]))
+            filepath = uri_to_path(uri)
+            groups[filepath] = locs
+            relpath = path.relpath(filepath, pwd)
+            start = locs[0]["range"]["start"]
+            candidates.append({
+                "word": relpath,
+                "abbr": '{0} ({1})'.format(relpath, len(locs)),
+                "action__path": filepath,
+                "action__line": start["line"] + 1,
+                "action__col": start["character"] + 1,
+                "action__references": len(locs),
+            })
+
+        if order == 'path':
+            candidates.sort(key=lambda c: c["word"])
+        else:
+            candidates.sort(key=lambda c: (-c["action__references"],
+                                           c["word"]))
+        return candidates
+
     def gather_candidates(self, context):
-        result = self.vim.funcs.LanguageClient_runSync(
-            "LanguageClient#textDocument_references", {}) or []
-        return self.convert_to_candidates(result)
+        common = import_common()
+        editor = common.editor_context(self.vim, context)
+        args = context['args']
+        if args[:1] == ['file']:
+            # Only the first call lists the locations, later ones take what
+            # has been converted since.
+            if len(args) < 2 or not isinstance(args[1], list):
+                self.print_message(
+                    context, 'references:file expands references:grouped.')
+                return []
+            locations = [] if context['is_async'] else args[1]
+            return common.convert_candidates(
+                context, self.convert_to_candidates, locations, editor['cwd'])
+
+        if not editor['serverRunning']:
+            self.print_message(context, common.NO_SERVER_MESSAGE)
+            return []
+
+        # References are listed as the server streams them, if it supports
+        # partial results.
+        if not context['is_async']:
+            context['__locations'] = []
+            common.start_streaming(
+                self.vim, context, "LanguageClient#textDocument_references",
+                {})
+        locations = common.take_partial_results(self, context)
+
+        if args[:1] == ['grouped']:
+            # Files can only be counted once every reference is known.
+            context['__locations'] += locations
+            if context['is_async']:
+                return []
+            order = args[1] if len(args) > 1 else 'count'
+            context['__groups'] = {}
+            return self.convert_to_groups(
+                context.pop('__locations'), order, editor['cwd'],
+                context['__groups'])
+
+        return common.convert_candidates(
+            context, self.convert_to_candidates, locations, editor['cwd'])
+
+
+def make_grouped_kind(vim, source_context: Dict):
+    # Imported here as the kind is only needed for grouped references.
+    from denite.kind.file import Kind as File
+
+    class Kind(File):
+        def __init__(self, vim):
+            super().__init__(vim)
+
+            self.name = 'references'
+            self.default_action = 'expand'
+
+        def action_expand(self, context):
+            # Only the locations of the selected files are passed on.
+            groups = source_context.get('__groups', {})
+            locations = [loc for target in context['targets']
+                         for loc in groups.get(target['action__path'], [])]
+            context['sources_queue'].append([{
+                'name': 'references',
+                'args': ['file', locations],
+            }])
+
+    return Kind(vim)
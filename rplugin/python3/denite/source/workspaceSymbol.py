@@ -3,13 +3,15 @@ import sys
 
 from .base import Base
 
-sys.path.insert(0, path.dirname(path.dirname(__file__)))
 
-from common import (  # isort:skip  # noqa: I100 E402
-    convert_symbols_to_candidates,
-    SYMBOL_CANDIDATE_HIGHLIGHT_SYNTAX,
-    highlight_setup,
-)
+def import_common():
+    # See documentSymbol.import_common.
+    common_path = path.dirname(path.dirname(__file__))
+    if common_path not in sys.path:
+        sys.path.insert(0, common_path)
+
+    import common  # isort:skip  # noqa: I100
+    return common
 
 
 class Source(Base):
@@ -20,13 +22,38 @@ class Source(Base):
         self.name = 'workspaceSymbol'
         self.kind = 'file'
 
+    def on_close(self, context):
+        import_common().stop(self.vim, context)
+
     def highlight(self):
-        highlight_setup(self, SYMBOL_CANDIDATE_HIGHLIGHT_SYNTAX)
+        common = import_common()
+        common.highlight_setup(self, common.SYMBOL_CANDIDATE_HIGHLIGHT_SYNTAX)
 
     def gather_candidates(self, context):
         context['is_interactive'] = True
         prefix = context['input']
         bufnr = context['bufnr']
+        common = import_common()
+
+        # Symbols are listed as the server streams them, if it supports
+        # partial results. A new input starts a new request.
+        if context['is_async'] and context.get('__query') == prefix:
+            return common.convert_candidates(
+                context, common.convert_symbols_to_candidates,
+                common.take_partial_results(self, context), None,
+                common.editor_context(self.vim, context)['cwd'],
+                common.column_widths(context))
+        context['__query'] = prefix
+        common.stop(self.vim, context)
+
+        # The current buffer changes once denite is open, take a new
+        # snapshot for every query.
+        context.pop('__editor', None)
+        context.pop('__widths', None)
+        editor = common.editor_context(self.vim, context)
+        if not editor['serverRunning']:
+            self.print_message(context, common.NO_SERVER_MESSAGE)
+            return []
 
         # This a hack to get around the fact that LanguageClient APIs
         # work in the context of the active buffer, when filtering results
@@ -36,18 +63,17 @@ class Source(Base):
         # and execute the command from it. This should be changed when we
         # have a better way to run requests out of the buffer.
         # See issue#674
-        current_buffer = self.vim.current.buffer.number
-        if current_buffer != bufnr:
-            self.vim.command("tabedit %")
+        switch_buffer = editor['currentBufnr'] != bufnr
+        if switch_buffer:
             self.vim.command(
-                "execute 'noautocmd keepalt buffer' {}".format(bufnr))
-        result = self.vim.funcs.LanguageClient_runSync(
-            'LanguageClient#workspace_symbol', prefix, {}) or []
-        if current_buffer != bufnr:
+                "tabedit % | execute 'noautocmd keepalt buffer' {}".format(
+                    bufnr))
+        common.start_streaming(
+            self.vim, context, 'LanguageClient#workspace_symbol', prefix, {})
+        if switch_buffer:
             self.vim.command("tabclose")
 
-        candidates = convert_symbols_to_candidates(
-            result,
-            pwd=self.vim.funcs.getcwd())
-
-        return candidates
+        return common.convert_candidates(
+            context, common.convert_symbols_to_candidates,
+            common.take_partial_results(self, context), None, editor['cwd'],
+            common.column_widths(context))
@@ -1,3 +1,5 @@
+import json
+
 from .base import Base
 
 
@@ -12,9 +14,24 @@ class Source(Base):
         self.mark = "[LC]"
         self.rank = 1000
         self.min_pattern_length = 1
-        self.filetypes = vim.eval(
-            "get(g:, 'LanguageClient_serverCommands', {})").keys()
         self.input_pattern = r'(\.|::|->)\w*$'
+        # Whether buffers have a server is looked up on first use instead of
+        # here, as the constructor runs while the remote plugin host is
+        # loading.
+        self.events = ["InsertEnter"]
+        self.has_server_by_bufnr = {}
+
+    def on_event(self, context):
+        # LanguageClient_serverCommands may change at any time (e.g. through
+        # LanguageClient_registerServerCommands), look it up again on the
+        # next gather.
+        self.has_server_by_bufnr = {}
+
+    def has_server(self, bufnr):
+        if bufnr not in self.has_server_by_bufnr:
+            editor = self.vim.funcs.LanguageClient_editorContext(bufnr)
+            self.has_server_by_bufnr[bufnr] = editor["hasServer"]
+        return self.has_server_by_bufnr[bufnr]
 
     def gather_candidates(self, context):
         if context["is_async"]:
@@ -25,13 +42,16 @@ class Source(Base):
                 candidates = outputs[0].get("result", [])
                 # log(str(candidates))
                 return candidates
-        else:
+        elif self.has_server(context["bufnr"]):
             context["is_async"] = True
-            self.vim.command("let {} = []".format(COMPLETE_OUTPUTS))
             character = (context["complete_position"]
                          + len(context["complete_str"]))
-            self.vim.funcs.LanguageClient_omniComplete({
+            params = json.dumps({
                 "character": character,
                 "complete_position": context["complete_position"],
             })
+            # Reset the outputs and start the request in a single call.
+            self.vim.command(
+                "let {} = [] | call LanguageClient_omniComplete({})".format(
+                    COMPLETE_OUTPUTS, params))
         return []
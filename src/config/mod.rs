@@ -12,6 +12,7 @@ use crate::{
 use anyhow::{anyhow, Result};
 use lsp_types::{DiagnosticSeverity, MarkupKind, MessageType, TraceOption};
 use serde::Deserialize;
+use serde_json::Value;
 use std::collections::HashMap;
 use std::{path::PathBuf, str::FromStr, time::Duration};
 
@@ -26,6 +27,7 @@ pub struct Config {
     pub root_markers: Option<RootMarkers>,
     pub change_throttle: Option<Duration>,
     pub wait_output_timeout: Duration,
+    pub server_request_timeout: Option<Duration>,
     pub diagnostics_enable: bool,
     pub diagnostics_list: DiagnosticsList,
     pub diagnostics_display: HashMap<u64, DiagnosticsDisplay>,
@@ -36,6 +38,7 @@ pub struct Config {
     pub is_nvim: bool,
     pub logging_file: Option<PathBuf>,
     pub logging_level: log::LevelFilter,
+    pub recording_file: Option<PathBuf>,
     pub server_stderr: Option<String>,
     pub diagnostics_signs_max: Option<usize>,
     pub diagnostics_max_severity: DiagnosticSeverity,
@@ -78,6 +81,7 @@ impl Default for Config {
             root_markers: None,
             change_throttle: None,
             wait_output_timeout: Duration::from_secs(10),
+            server_request_timeout: Some(Duration::from_secs(60)),
             hover_preview: HoverPreviewOption::default(),
             completion_prefer_text_edit: false,
             apply_completion_text_edits: true,
@@ -90,6 +94,7 @@ impl Default for Config {
             is_nvim: false,
             logging_file: None,
             logging_level: log::LevelFilter::Off,
+            recording_file: None,
             restart_on_crash: true,
             max_restart_retries: 5,
         }
@@ -100,6 +105,7 @@ impl Default for Config {
 struct DeserializableConfig {
     logging_file: Option<PathBuf>,
     logging_level: log::LevelFilter,
+    recording_file: Option<PathBuf>,
     server_stderr: Option<String>,
     auto_start: u8,
     server_commands: HashMap<String, ServerCommand>,
@@ -110,6 +116,7 @@ struct DeserializableConfig {
     root_markers: Option<RootMarkers>,
     change_throttle: Option<f64>,
     wait_output_timeout: Option<f64>,
+    sync_timeout: Value,
     diagnostics_enable: u8,
     diagnostics_list: Option<String>,
     diagnostics_display: HashMap<u64, DiagnosticsDisplay>,
@@ -147,6 +154,7 @@ impl Config {
             "root_markers": get(g:, 'LanguageClient_rootMarkers', v:null),
             "change_throttle": get(g:, 'LanguageClient_changeThrottle', v:null),
             "wait_output_timeout": get(g:, 'LanguageClient_waitOutputTimeout', v:null),
+            "sync_timeout": get(g:, 'LanguageClient_syncTimeout', 30),
             "diagnostics_enable": !!get(g:, 'LanguageClient_diagnosticsEnable', 1),
             "diagnostics_list": get(g:, 'LanguageClient_diagnosticsList', 'Quickfix'),
             "diagnostics_display": get(g:, 'LanguageClient_diagnosticsDisplay', {}),
@@ -172,6 +180,7 @@ impl Config {
             "max_restart_retries": get(g:, 'LanguageClient_maxRestartRetries', 5),
             "logging_file": get(g:, 'LanguageClient_loggingFile', v:null),
             "logging_level": get(g:, 'LanguageClient_loggingLevel', 'WARN'),
+            "recording_file": get(g:, 'LanguageClient_recordingFile', v:null),
             "server_stderr": get(g:, 'LanguageClient_serverStderr', v:null),
         }"#;
 
@@ -208,6 +217,7 @@ impl Config {
             wait_output_timeout: Duration::from_millis(
                 (res.wait_output_timeout.unwrap_or(10.0) * 1000.0) as u64,
             ),
+            server_request_timeout: server_request_timeout(&res.sync_timeout),
             diagnostics_enable: res.diagnostics_enable == 1,
             diagnostics_list,
             diagnostics_display: res.diagnostics_display,
@@ -218,6 +228,7 @@ impl Config {
             is_nvim: res.is_nvim == 1,
             logging_file: res.logging_file,
             logging_level: res.logging_level,
+            recording_file: res.recording_file,
             server_stderr: res.server_stderr,
             diagnostics_signs_max: res.diagnostics_signs_max,
             diagnostics_max_severity: diagnostics_severity(&res.diagnostics_max_severity)?,
@@ -238,6 +249,21 @@ impl Config {
     }
 }
 
+/// How long to wait for the response of a server request: 60 seconds, or the longest deadline of
+/// LanguageClient_syncTimeout if longer, so that synchronous requests are only ever cut short by
+/// vim. None, waiting forever, if any of those deadlines is 0.
+fn server_request_timeout(sync_timeout: &Value) -> Option<Duration> {
+    let deadlines: Vec<f64> = match sync_timeout {
+        Value::Object(deadlines) => deadlines.values().filter_map(Value::as_f64).collect(),
+        deadline => deadline.as_f64().into_iter().collect(),
+    };
+    if deadlines.iter().any(|deadline| *deadline <= 0.0) {
+        return None;
+    }
+    let longest = deadlines.into_iter().fold(60.0, f64::max);
+    Some(Duration::from_millis((longest * 1000.0) as u64))
+}
+
 fn trace(s: &str) -> Result<TraceOption> {
     match s.to_ascii_uppercase().as_str() {
         "OFF" => Ok(TraceOption::Off),
@@ -272,3 +298,23 @@ fn diagnostics_severity(s: &str) -> Result<DiagnosticSeverity> {
         )),
     }
 }
+
+#[cfg(test)]
+mod test {
+    use super::*;
+    use serde_json::json;
+
+    #[test]
+    fn test_server_request_timeout() {
+        let secs = |secs| Some(Duration::from_secs(secs));
+        assert_eq!(server_request_timeout(&json!(30)), secs(60));
+        assert_eq!(server_request_timeout(&json!(600)), secs(600));
+        assert_eq!(server_request_timeout(&json!(0)), None);
+        assert_eq!(
+            server_request_timeout(&json!({"workspace/symbol": 120, "*": 10})),
+            secs(120)
+        );
+        assert_eq!(server_request_timeout(&json!({"*": 0})), None);
+        assert_eq!(server_request_timeout(&json!(1.5e2)), secs(150));
+    }
+}
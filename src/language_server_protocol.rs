@@ -7,9 +7,10 @@ use crate::{
     rpcclient::RpcClient,
     types::*,
     utils::{
-        apply_text_edits, code_action_kind_as_str, convert_to_vim_str, decode_parameter_label,
-        escape_single_quote, expand_json_path, get_default_initialization_options, get_root_path,
-        vim_cmd_args_to_value, Canonicalize, Combine, ToUrl,
+        apply_text_changes, apply_text_edits, code_action_kind_as_str, convert_to_vim_str,
+        decode_parameter_label, escape_single_quote, expand_json_path,
+        get_default_initialization_options, get_root_path, into_code_action,
+        text_document_content_change, vim_cmd_args_to_value, Canonicalize, Combine, ToUrl,
     },
     viewport,
     watcher::FSWatch,
@@ -23,28 +24,28 @@ use log::{debug, error, info, warn};
 use lsp_types::{
     notification::Notification, request::Request, ApplyWorkspaceEditParams,
     ApplyWorkspaceEditResponse, ClientCapabilities, ClientInfo, CodeAction, CodeActionCapability,
-    CodeActionContext, CodeActionKind, CodeActionKindLiteralSupport, CodeActionLiteralSupport,
-    CodeActionOrCommand, CodeActionParams, CodeActionResponse, CodeLens, Command,
-    CompletionCapability, CompletionItem, CompletionItemCapability, CompletionResponse,
-    CompletionTextEdit, Diagnostic, DiagnosticSeverity, DidChangeConfigurationParams,
-    DidChangeTextDocumentParams, DidChangeWatchedFilesParams,
-    DidChangeWatchedFilesRegistrationOptions, DidCloseTextDocumentParams,
-    DidOpenTextDocumentParams, DidSaveTextDocumentParams, DocumentChangeOperation, DocumentChanges,
-    DocumentFormattingParams, DocumentHighlight, DocumentHighlightKind,
-    DocumentRangeFormattingParams, DocumentSymbolParams, DocumentSymbolResponse, Documentation,
-    ExecuteCommandParams, FormattingOptions, GenericCapability, GotoCapability,
-    GotoDefinitionResponse, Hover, HoverCapability, InitializeParams, InitializeResult,
-    InitializedParams, Location, LogMessageParams, MessageType, NumberOrString,
-    ParameterInformation, ParameterInformationSettings, PartialResultParams, Position,
-    ProgressParams, ProgressParamsValue, PublishDiagnosticsClientCapabilities,
+    CodeActionCapabilityResolveSupport, CodeActionContext, CodeActionKind,
+    CodeActionKindLiteralSupport, CodeActionLiteralSupport, CodeActionOrCommand, CodeActionParams,
+    CodeActionResponse, CodeLens, Command, CompletionCapability, CompletionItem,
+    CompletionItemCapability, CompletionResponse, CompletionTextEdit, Diagnostic,
+    DiagnosticSeverity, DidChangeConfigurationParams, DidChangeTextDocumentParams,
+    DidChangeWatchedFilesParams, DidChangeWatchedFilesRegistrationOptions,
+    DidCloseTextDocumentParams, DidOpenTextDocumentParams, DidSaveTextDocumentParams,
+    DocumentChangeOperation, DocumentChanges, DocumentFormattingParams, DocumentHighlight,
+    DocumentHighlightKind, DocumentRangeFormattingParams, DocumentSymbolParams,
+    DocumentSymbolResponse, Documentation, ExecuteCommandParams, FormattingOptions,
+    GenericCapability, GotoCapability, GotoDefinitionResponse, Hover, HoverCapability,
+    InitializeParams, InitializeResult, InitializedParams, Location, LogMessageParams, MessageType,
+    NumberOrString, ParameterInformation, ParameterInformationSettings, PartialResultParams,
+    Position, ProgressParams, ProgressParamsValue, PublishDiagnosticsClientCapabilities,
     PublishDiagnosticsParams, Range, ReferenceContext, RegistrationParams, RenameParams,
     ResourceOp, SemanticHighlightingClientCapability, SemanticHighlightingParams,
     ShowMessageParams, ShowMessageRequestParams, SignatureHelp, SignatureHelpCapability,
     SignatureInformationSettings, SymbolInformation, TextDocumentClientCapabilities,
     TextDocumentContentChangeEvent, TextDocumentIdentifier, TextDocumentItem,
-    TextDocumentPositionParams, TextEdit, UnregistrationParams, VersionedTextDocumentIdentifier,
-    WorkDoneProgress, WorkDoneProgressParams, WorkspaceClientCapabilities, WorkspaceEdit,
-    WorkspaceSymbolParams,
+    TextDocumentPositionParams, TextDocumentSyncCapability, TextDocumentSyncKind, TextEdit,
+    UnregistrationParams, VersionedTextDocumentIdentifier, WorkDoneProgress,
+    WorkDoneProgressParams, WorkspaceClientCapabilities, WorkspaceEdit, WorkspaceSymbolParams,
 };
 use maplit::hashmap;
 use serde::de::Deserialize;
@@ -96,9 +97,11 @@ impl LanguageClient {
     fn sync_settings(&self) -> Result<()> {
         let mut config = Config::parse(self.vim()?)?;
         self.update_state(|state| {
-            state
-                .logger
-                .update_settings(config.logging_level.clone(), config.logging_file.clone())
+            state.logger.update_settings(
+                config.logging_level.clone(),
+                config.logging_file.clone(),
+                config.recording_file.clone(),
+            )
         })?;
 
         let semantic_highlight_language_ids: Vec<String> =
@@ -915,6 +918,12 @@ impl LanguageClient {
                                     .collect(),
                                 },
                             }),
+                            // Let servers defer computing edits until an action is picked, see
+                            // resolve_code_action.
+                            data_support: Some(true),
+                            resolve_support: Some(CodeActionCapabilityResolveSupport {
+                                properties: vec!["edit".to_owned()],
+                            }),
                             ..CodeActionCapability::default()
                         }),
                         signature_help: Some(SignatureHelpCapability {
@@ -1305,9 +1314,11 @@ impl LanguageClient {
             return Err(anyhow!("No code actions found with kind {}", kind));
         }
 
+        let filename = self.vim()?.get_filename(params)?;
+        let language_id = self.vim()?.get_language_id(&filename, params)?;
         match actions.first().cloned() {
             Some(CodeActionOrCommand::CodeAction(action)) => {
-                self.handle_code_action_selection(&[action], 0)?
+                self.handle_code_action_selection(&language_id, &[action], 0)?
             }
             _ => return Err(anyhow!("No code actions found with kind {}", kind)),
         }
@@ -1317,26 +1328,13 @@ impl LanguageClient {
 
     #[tracing::instrument(level = "info", skip(self))]
     pub fn text_document_code_action(&self, params: &Value) -> Result<Value> {
+        let filename = self.vim()?.get_filename(params)?;
+        let language_id = self.vim()?.get_language_id(&filename, params)?;
         let result = self.get_code_actions(params)?;
         let response = <Option<CodeActionResponse>>::deserialize(&result)?;
         let response = response.unwrap_or_default();
 
-        // Convert any Commands into CodeActions, so that the remainder of the handling can be
-        // shared.
-        let actions: Vec<_> = response
-            .into_iter()
-            .map(|action_or_command| match action_or_command {
-                CodeActionOrCommand::Command(command) => CodeAction {
-                    title: command.title.clone(),
-                    kind: Some(command.command.clone().into()),
-                    diagnostics: None,
-                    edit: None,
-                    command: Some(command),
-                    ..CodeAction::default()
-                },
-                CodeActionOrCommand::CodeAction(action) => action,
-            })
-            .collect();
+        let actions: Vec<_> = response.into_iter().map(into_code_action).collect();
 
         self.update_state(|state| {
             state.stashed_code_action_actions = actions.clone();
@@ -1348,15 +1346,44 @@ impl LanguageClient {
         }
 
         self.present_actions("Code Actions", &actions, |idx| -> Result<()> {
-            self.handle_code_action_selection(&actions, idx)
+            self.handle_code_action_selection(&language_id, &actions, idx)
         })?;
 
         Ok(result)
     }
 
-    fn handle_code_action_selection(&self, actions: &[CodeAction], idx: usize) -> Result<()> {
+    /// Applies a code action picked outside of the client, e.g. by the denite source.
+    #[tracing::instrument(level = "info", skip(self))]
+    pub fn apply_code_action(&self, params: &Value) -> Result<()> {
+        let filename = self.vim()?.get_filename(params)?;
+        let language_id = self.vim()?.get_language_id(&filename, params)?;
+        let action: CodeActionOrCommand =
+            try_get("action", params)?.ok_or_else(|| anyhow!("action not found in request!"))?;
+        self.handle_code_action_selection(&language_id, &[into_code_action(action)], 0)
+    }
+
+    /// Fetches the edit of a code action listed without one, for servers that support
+    /// codeAction/resolve.
+    fn resolve_code_action(&self, language_id: &str, action: &CodeAction) -> Result<CodeAction> {
+        if action.edit.is_some() || action.data.is_none() {
+            return Ok(action.clone());
+        }
+
+        let action = self
+            .get_client(&Some(language_id.to_owned()))?
+            .call(lsp_types::request::CodeActionResolveRequest::METHOD, action)?;
+        Ok(action)
+    }
+
+    fn handle_code_action_selection(
+        &self,
+        language_id: &str,
+        actions: &[CodeAction],
+        idx: usize,
+    ) -> Result<()> {
         match actions.get(idx) {
             Some(action) => {
+                let action = &self.resolve_code_action(language_id, action)?;
                 // Apply edit before command.
                 if let Some(edit) = &action.edit {
                     self.apply_workspace_edit(edit)?;
@@ -1731,11 +1758,14 @@ impl LanguageClient {
         let language_id = self.vim()?.get_language_id(&filename, params)?;
 
         let query = try_get("query", params)?.unwrap_or_default();
+        let partial_result_token = try_get("partialResultToken", params)?;
         let result = self.get_client(&Some(language_id))?.call(
             lsp_types::request::WorkspaceSymbol::METHOD,
             WorkspaceSymbolParams {
                 query,
-                partial_result_params: PartialResultParams::default(),
+                partial_result_params: PartialResultParams {
+                    partial_result_token,
+                },
                 work_done_progress_params: WorkDoneProgressParams::default(),
             },
         )?;
@@ -1847,15 +1877,29 @@ impl LanguageClient {
         // code action, as the index may be incorrect.
         let source = source?;
 
+        let language_id = self.vim()?.get_language_id(&filename, params)?;
         self.present_actions("Code Lens Actions", &source, |idx| -> Result<()> {
-            self.handle_code_action_selection(&actions, idx)
+            self.handle_code_action_selection(&language_id, &actions, idx)
         })?;
 
         Ok(Value::Null)
     }
 
+    /// Cancels the language server requests made while handling vim request `id`.
+    #[tracing::instrument(level = "info", skip(self))]
+    pub fn cancel_request(&self, params: &Value) -> Result<()> {
+        let id: Id = try_get("id", params)?.ok_or_else(|| anyhow!("id not found in request!"))?;
+        let clients =
+            self.get_state(|state| state.clients.values().cloned().collect::<Vec<_>>())?;
+        for client in clients {
+            client.cancel(id)?;
+        }
+        Ok(())
+    }
+
     #[tracing::instrument(level = "info", skip(self))]
     pub fn progress(&self, params: &Value) -> Result<()> {
+        // Partial results are forwarded to vim by the reader of the server, see RpcClient::new.
         let params = ProgressParams::deserialize(params)?;
         let message = match params.value {
             ProgressParamsValue::WorkDone(wd) => match wd {
@@ -1947,7 +1991,7 @@ impl LanguageClient {
     pub fn text_document_did_open(&self, params: &Value) -> Result<()> {
         let filename = self.vim()?.get_filename(params)?;
         let language_id = self.vim()?.get_language_id(&filename, params)?;
-        let text = self.vim()?.get_text(&filename)?;
+        let changes = self.vim()?.get_text_changes(&filename, None)?;
         let set_omnifunc: bool = self
             .vim()?
             .eval("s:GetVar('LanguageClient_setOmnifunc', v:true)")?;
@@ -1956,10 +2000,15 @@ impl LanguageClient {
             uri: filename.to_url()?,
             language_id: language_id.clone(),
             version: 0,
-            text: text.join("\n"),
+            text: changes.lines.join("\n"),
         };
 
         self.update_state(|state| {
+            state
+                .text_documents_metadata
+                .entry(filename.clone())
+                .or_insert_with(TextDocumentItemMetadata::default)
+                .changedtick = Some(changes.changedtick);
             Ok(state
                 .text_documents
                 .insert(filename.clone(), text_document.clone()))
@@ -1999,20 +2048,48 @@ impl LanguageClient {
             return self.text_document_did_open(params);
         }
 
-        let text = self.vim()?.get_text(&filename)?.join("\n");
-        let text_state = self.get_state(|state| {
-            state
-                .text_documents
-                .get(&filename)
-                .map(|d| d.text.clone())
-                .unwrap_or_default()
+        let (text_state, changedtick) = self.get_state(|state| {
+            (
+                state
+                    .text_documents
+                    .get(&filename)
+                    .map(|d| d.text.clone())
+                    .unwrap_or_default(),
+                state
+                    .text_documents_metadata
+                    .get(&filename)
+                    .and_then(|m| m.changedtick),
+            )
         })?;
-        if text == text_state {
-            return Ok(());
-        }
+        let lines_state: Vec<&str> = text_state.split('\n').collect();
+
+        // Vim only sends the lines changed since the text was last synced, or all of them if it
+        // doesn't know what changed since then.
+        let changes = self.vim()?.get_text_changes(&filename, changedtick)?;
+        let (changedtick, lines) = match apply_text_changes(&lines_state, &changes) {
+            Some(lines) => (changes.changedtick, lines),
+            None => {
+                warn!("Text changes don't apply to the synced text, syncing the whole text");
+                let changes = self.vim()?.get_text_changes(&filename, None)?;
+                (changes.changedtick, changes.lines)
+            }
+        };
 
+        let text = lines.join("\n");
         let change_throttle = self.get_config(|c| c.change_throttle.is_some())?;
         let version = self.update_state(|state| {
+            let metadata = state
+                .text_documents_metadata
+                .entry(filename.clone())
+                .or_insert_with(TextDocumentItemMetadata::default);
+            metadata.changedtick = Some(changedtick);
+            if text == text_state {
+                return Ok(None);
+            }
+            if change_throttle {
+                metadata.last_change = Instant::now();
+            }
+
             let document = state
                 .text_documents
                 .get_mut(&filename)
@@ -2021,16 +2098,24 @@ impl LanguageClient {
             let version = document.version + 1;
             document.version = version;
             document.text = text.clone();
-
-            if change_throttle {
-                let metadata = state
-                    .text_documents_metadata
-                    .entry(filename.clone())
-                    .or_insert_with(TextDocumentItemMetadata::default);
-                metadata.last_change = Instant::now();
-            }
-            Ok(version)
+            Ok(Some(version))
         })?;
+        let version = match version {
+            Some(version) => version,
+            None => return Ok(()),
+        };
+
+        let content_change =
+            if self.text_document_sync_kind(&language_id)? == TextDocumentSyncKind::Incremental {
+                text_document_content_change(&lines_state, &lines)
+            } else {
+                None
+            };
+        let content_change = content_change.unwrap_or(TextDocumentContentChangeEvent {
+            range: None,
+            range_length: None,
+            text,
+        });
 
         self.get_client(&Some(language_id.clone()))?.notify(
             lsp_types::notification::DidChangeTextDocument::METHOD,
@@ -2039,11 +2124,7 @@ impl LanguageClient {
                     uri: filename.to_url()?,
                     version: Some(version),
                 },
-                content_changes: vec![TextDocumentContentChangeEvent {
-                    range: None,
-                    range_length: None,
-                    text,
-                }],
+                content_changes: vec![content_change],
             },
         )?;
 
@@ -2053,6 +2134,23 @@ impl LanguageClient {
         Ok(())
     }
 
+    /// How the server of `language_id` wants to be sent changes to documents.
+    fn text_document_sync_kind(&self, language_id: &str) -> Result<TextDocumentSyncKind> {
+        self.get_state(|state| {
+            let sync = state
+                .capabilities
+                .get(language_id)
+                .and_then(|result| result.capabilities.text_document_sync.as_ref());
+            match sync {
+                Some(TextDocumentSyncCapability::Kind(kind)) => *kind,
+                Some(TextDocumentSyncCapability::Options(options)) => {
+                    options.change.unwrap_or(TextDocumentSyncKind::Full)
+                }
+                None => TextDocumentSyncKind::Full,
+            }
+        })
+    }
+
     #[tracing::instrument(level = "info", skip(self))]
     pub fn text_document_did_save(&self, params: &Value) -> Result<()> {
         let filename = self.vim()?.get_filename(params)?;
@@ -3233,8 +3331,10 @@ impl LanguageClient {
             .iter()
             .position(|it| code_action_kind_as_str(&it) == kind && it.title == title);
 
+        let filename = self.vim()?.get_filename(params)?;
+        let language_id = self.vim()?.get_language_id(&filename, params)?;
         match idx {
-            Some(idx) => self.handle_code_action_selection(&actions, idx)?,
+            Some(idx) => self.handle_code_action_selection(&language_id, &actions, idx)?,
             None => return Err(anyhow!("Action not stashed, please try again")),
         };
 
@@ -3674,6 +3774,12 @@ impl LanguageClient {
             }
         };
 
+        // Partial results of requests made with a partialResultToken (see
+        // LanguageClient_runStreaming) are forwarded to vim as they come.
+        let vim = self.vim()?;
+        let on_partial_result =
+            move |params: Value| vim.rpcclient.notify("s:HandlePartialResult", params);
+
         let client = RpcClient::new(
             Some(language_id.clone()),
             reader,
@@ -3681,7 +3787,9 @@ impl LanguageClient {
             child_id,
             self.get_state(|state| state.tx.clone())?,
             on_server_crash,
+            on_partial_result,
         )?;
+        client.set_timeout(self.get_config(|c| c.server_request_timeout)?);
         self.update_state(|state| {
             state
                 .clients
@@ -3915,6 +4023,7 @@ impl LanguageClient {
             msg += &format!("Language server stderr: {}\n", server_stderr,);
             msg += &format!("Log level: {}\n", state.logger.level);
             msg += &format!("Log file: {:?}\n", state.logger.path);
+            msg += &format!("Recording file: {:?}\n", state.logger.recording_path);
         })?;
         self.vim()?.echo(&msg)?;
         Ok(json!(msg))
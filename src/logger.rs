@@ -1,12 +1,63 @@
+use crate::types::LanguageId;
 use anyhow::{Context, Result};
 use derivative::Derivative;
-use log::LevelFilter;
+use log::{info, log_enabled, Level, LevelFilter};
 use log4rs::append::file::FileAppender;
 use log4rs::config::{Appender, Config, Root};
 use log4rs::encode::pattern::PatternEncoder;
 use serde::Serialize;
 use std::io::Write;
-use std::path::PathBuf;
+use std::path::{Path, PathBuf};
+use std::time::Instant;
+
+/// Log target of the JSON-RPC traffic recorded to `g:LanguageClient_recordingFile`.
+pub const RECORDING_TARGET: &str = "languageclient::recording";
+
+lazy_static! {
+    static ref RECORDING_START: Instant = Instant::now();
+}
+
+/// Appends a raw JSON-RPC message to the recording, if one is enabled. `direction` is either
+/// "recv" or "send", from the point of view of this client, and `language_id` is `None` for
+/// messages exchanged with vim.
+pub fn record(direction: &str, language_id: &LanguageId, message: &str) {
+    if !log_enabled!(target: RECORDING_TARGET, Level::Info) {
+        return;
+    }
+
+    info!(
+        target: RECORDING_TARGET,
+        "{}",
+        recording_line(
+            RECORDING_START.elapsed().as_secs_f64(),
+            direction,
+            language_id,
+            message
+        ),
+    );
+}
+
+/// One line of the recording. Servers may send pretty-printed JSON, which is re-serialized to fit
+/// on the line.
+fn recording_line(time: f64, direction: &str, language_id: &LanguageId, message: &str) -> String {
+    let language_id = match language_id {
+        Some(id) => serde_json::to_string(id).unwrap_or_default(),
+        None => "null".to_string(),
+    };
+    let compact;
+    let message = if message.contains(&['\n', '\r'][..]) {
+        compact = serde_json::from_str::<serde_json::Value>(message)
+            .and_then(|value| serde_json::to_string(&value))
+            .unwrap_or_else(|_| serde_json::to_string(message).unwrap_or_default());
+        compact.as_str()
+    } else {
+        message
+    };
+    format!(
+        r#"{{"time":{:.6},"direction":"{}","languageId":{},"message":{}}}"#,
+        time, direction, language_id, message,
+    )
+}
 
 #[derive(Derivative)]
 #[derivative(Debug)]
@@ -14,6 +65,7 @@ use std::path::PathBuf;
 pub struct Logger {
     pub level: LevelFilter,
     pub path: Option<PathBuf>,
+    pub recording_path: Option<PathBuf>,
 
     #[derivative(Debug = "ignore")]
     #[serde(skip_serializing)]
@@ -24,26 +76,42 @@ impl Logger {
     pub fn new() -> Result<Self> {
         let level = LevelFilter::Warn;
         let path = None;
+        let recording_path = None;
 
-        let config = create_config(&path, level)?;
+        let config = create_config(&path, level, &recording_path)?;
         let handle = log4rs::init_config(config)?;
         Ok(Logger {
             path,
             level,
+            recording_path,
             handle,
         })
     }
 
-    pub fn update_settings(&mut self, level: LevelFilter, path: Option<PathBuf>) -> Result<()> {
-        let config = create_config(&path, level)?;
+    pub fn update_settings(
+        &mut self,
+        level: LevelFilter,
+        path: Option<PathBuf>,
+        recording_path: Option<PathBuf>,
+    ) -> Result<()> {
+        // Settings are synced on every server start, only start a new recording if the file
+        // changed so that the traffic of servers started earlier is kept.
+        if recording_path != self.recording_path {
+            if let Some(recording_path) = &recording_path {
+                truncate_recording(recording_path)?;
+            }
+        }
+
+        let config = create_config(&path, level, &recording_path)?;
         self.handle.set_config(config);
         self.level = level;
         self.path = path;
+        self.recording_path = recording_path;
         Ok(())
     }
 
     pub fn set_level(&mut self, level: LevelFilter) -> Result<()> {
-        let config = create_config(&self.path, level)?;
+        let config = create_config(&self.path, level, &self.recording_path)?;
         self.handle.set_config(config);
         self.level = level;
         Ok(())
@@ -51,14 +119,29 @@ impl Logger {
 
     #[allow(dead_code)]
     pub fn set_path(&mut self, path: Option<PathBuf>) -> Result<()> {
-        let config = create_config(&path, self.level)?;
+        let config = create_config(&path, self.level, &self.recording_path)?;
         self.handle.set_config(config);
         self.path = path;
         Ok(())
     }
 }
 
-fn create_config(path: &Option<PathBuf>, level: LevelFilter) -> Result<Config> {
+fn truncate_recording(path: &Path) -> Result<()> {
+    let path = shellexpand::tilde(&path.to_string_lossy()).to_string();
+    std::fs::OpenOptions::new()
+        .create(true)
+        .write(true)
+        .truncate(true)
+        .open(&path)
+        .with_context(|| format!("Failed to open file ({})", path))?;
+    Ok(())
+}
+
+fn create_config(
+    path: &Option<PathBuf>,
+    level: LevelFilter,
+    recording_path: &Option<PathBuf>,
+) -> Result<Config> {
     let encoder =
         PatternEncoder::new("{date(%H:%M:%S)} {level} {thread} {file}:{line} {message}{n}");
 
@@ -92,6 +175,61 @@ fn create_config(path: &Option<PathBuf>, level: LevelFilter) -> Result<Config> {
             config_builder.appender(Appender::builder().build("logfile", Box::new(appender)));
         root_builder = root_builder.appender("logfile");
     }
+
+    if let Some(recording_path) = recording_path {
+        let recording_path = shellexpand::tilde(&recording_path.to_string_lossy()).to_string();
+        let appender = FileAppender::builder()
+            .encoder(Box::new(PatternEncoder::new("{message}{n}")))
+            .build(recording_path)?;
+        config_builder = config_builder
+            .appender(Appender::builder().build("recording", Box::new(appender)))
+            .logger(
+                log4rs::config::Logger::builder()
+                    .appender("recording")
+                    .additive(false)
+                    .build(RECORDING_TARGET, LevelFilter::Info),
+            );
+    } else {
+        config_builder = config_builder.logger(
+            log4rs::config::Logger::builder()
+                .additive(false)
+                .build(RECORDING_TARGET, LevelFilter::Off),
+        );
+    }
+
     let config = config_builder.build(root_builder.build(level))?;
     Ok(config)
 }
+
+#[cfg(test)]
+mod test {
+    use super::recording_line;
+    use serde_json::{json, Value};
+
+    #[test]
+    fn test_recording_line_multiline_message() {
+        let message = "{\n  \"jsonrpc\": \"2.0\",\r\n  \"id\": 1,\n  \"result\": \"a\\nb\"\n}";
+        let line = recording_line(1.5, "recv", &Some("rust".into()), message);
+        assert!(!line.contains('\n') && !line.contains('\r'));
+
+        let entry: Value = serde_json::from_str(&line).unwrap();
+        assert_eq!(
+            entry,
+            json!({
+                "time": 1.5,
+                "direction": "recv",
+                "languageId": "rust",
+                "message": {"jsonrpc": "2.0", "id": 1, "result": "a\nb"},
+            })
+        );
+    }
+
+    #[test]
+    fn test_recording_line_single_line_message() {
+        let message = r#"{"jsonrpc":"2.0","method":"exit"}"#;
+        assert_eq!(
+            recording_line(0.0, "send", &None, message),
+            r#"{"time":0.000000,"direction":"send","languageId":null,"message":{"jsonrpc":"2.0","method":"exit"}}"#,
+        );
+    }
+}
@@ -41,6 +41,7 @@ fn main() -> Result<()> {
         None,
         tx.clone(),
         |_: &LanguageId| {},
+        |_| Ok(()),
     )?);
 
     let state = State::new(tx, rpcclient, logger);
@@ -1,20 +1,38 @@
+use crate::logger;
 use crate::types::{Call, Id, LSError, LanguageId, RawMessage, ToInt, ToParams, ToRpcError};
 use anyhow::{anyhow, Result};
 use crossbeam::channel::{bounded, unbounded, Receiver, Sender};
 use log::*;
+use lsp_types::notification::{Cancel, Notification, Progress};
 use regex::Regex;
 use serde::{de::DeserializeOwned, Serialize};
+use serde_json::{json, Value};
 use std::io::Write;
 use std::str::FromStr;
 use std::{
+    cell::Cell,
     collections::HashMap,
     io::BufRead,
     sync::atomic::{AtomicU64, Ordering},
+    sync::Mutex,
     thread,
     time::Duration,
 };
 
 const CONTENT_MODIFIED_ERROR_CODE: i64 = -32801;
+const REQUEST_CANCELLED_ERROR_CODE: i64 = -32800;
+
+thread_local! {
+    // Id of the vim request handled by the current thread. Every call is handled on its own
+    // thread (see LanguageClient::loop_call), so the server requests made while handling it can
+    // be cancelled along with it.
+    static VIM_REQUEST_ID: Cell<Option<Id>> = Cell::new(None);
+}
+
+/// Marks the current thread as handling vim request `id`, see `RpcClient::cancel`.
+pub fn set_vim_request_id(id: Option<Id>) {
+    VIM_REQUEST_ID.with(|cell| cell.set(id));
+}
 
 lazy_static! {
     // this regex is used to remove some additional fields that we get from some servers, namely:
@@ -32,6 +50,12 @@ pub struct RpcClient {
     writer_tx: Sender<RawMessage>,
     #[serde(skip_serializing)]
     reader_tx: Sender<(Id, Sender<jsonrpc_core::Output>)>,
+    /// Ids of the requests in flight, by id of the vim request they were made for.
+    #[serde(skip_serializing)]
+    vim_requests: Mutex<HashMap<Id, Vec<Id>>>,
+    /// Milliseconds to wait for the response of a request, 0 waits forever.
+    #[serde(skip_serializing)]
+    timeout: AtomicU64,
     pub process_id: Option<u32>,
 }
 
@@ -44,6 +68,7 @@ impl RpcClient {
         process_id: Option<u32>,
         sink: Sender<Call>,
         on_crash: impl Fn(&LanguageId) + Clone + Send + 'static,
+        on_partial_result: impl Fn(Value) -> Result<()> + Send + 'static,
     ) -> Result<Self> {
         let (reader_tx, reader_rx): (Sender<(Id, Sender<jsonrpc_core::Output>)>, _) = unbounded();
 
@@ -53,7 +78,13 @@ impl RpcClient {
         thread::Builder::new()
             .name(reader_thread_name.clone())
             .spawn(move || {
-                if let Err(err) = loop_read(reader, reader_rx, &sink, &language_id_clone) {
+                if let Err(err) = loop_read(
+                    reader,
+                    reader_rx,
+                    &sink,
+                    &on_partial_result,
+                    &language_id_clone,
+                ) {
                     match err.downcast_ref::<std::io::Error>() {
                         Some(err) if err.kind() == std::io::ErrorKind::UnexpectedEof => {
                             on_crash_clone(&language_id_clone)
@@ -89,6 +120,8 @@ impl RpcClient {
             process_id,
             reader_tx,
             writer_tx,
+            vim_requests: Mutex::default(),
+            timeout: AtomicU64::new(60_000),
         })
     }
 
@@ -105,11 +138,39 @@ impl RpcClient {
             method: method.to_owned(),
             params: params.to_params()?,
         };
+        let vim_request_id = if self.language_id.is_some() {
+            VIM_REQUEST_ID.with(Cell::get)
+        } else {
+            None
+        };
+        if let Some(vim_request_id) = vim_request_id {
+            self.lock_vim_requests()?
+                .entry(vim_request_id)
+                .or_default()
+                .push(id);
+        }
+
         let (tx, rx) = bounded(1);
         self.reader_tx.send((id, tx))?;
         self.writer_tx.send(RawMessage::MethodCall(msg))?;
-        // TODO: duration from config.
-        match rx.recv_timeout(Duration::from_secs(60))? {
+        let output = match self.timeout.load(Ordering::SeqCst) {
+            0 => rx.recv().map_err(anyhow::Error::from),
+            timeout => rx
+                .recv_timeout(Duration::from_millis(timeout))
+                .map_err(anyhow::Error::from),
+        };
+
+        if let Some(vim_request_id) = vim_request_id {
+            let mut vim_requests = self.lock_vim_requests()?;
+            if let Some(ids) = vim_requests.get_mut(&vim_request_id) {
+                ids.retain(|i| *i != id);
+                if ids.is_empty() {
+                    vim_requests.remove(&vim_request_id);
+                }
+            }
+        }
+
+        match output? {
             jsonrpc_core::Output::Success(ok) => Ok(serde_json::from_value(ok.result)?),
             // NOTE: Errors with code -32801 correspond to the protocol's ContentModified error,
             // which we don't want to show to the user and should ignore, as the result of the
@@ -120,10 +181,40 @@ impl RpcClient {
             {
                 Err(anyhow::Error::from(LSError::ContentModified))
             }
+            jsonrpc_core::Output::Failure(err)
+                if err.error.code.code() == REQUEST_CANCELLED_ERROR_CODE =>
+            {
+                Err(anyhow::Error::from(LSError::RequestCancelled))
+            }
             jsonrpc_core::Output::Failure(err) => Err(anyhow!("Error: {:?}", err)),
         }
     }
 
+    /// Sets how long to wait for the response of a request, None waits forever.
+    pub fn set_timeout(&self, timeout: Option<Duration>) {
+        let timeout = timeout.map_or(0, |timeout| timeout.as_millis().max(1) as u64);
+        self.timeout.store(timeout, Ordering::SeqCst);
+    }
+
+    /// Sends `$/cancelRequest` for the requests still in flight that were made while handling vim
+    /// request `vim_request_id`.
+    pub fn cancel(&self, vim_request_id: Id) -> Result<()> {
+        let ids = self
+            .lock_vim_requests()?
+            .remove(&vim_request_id)
+            .unwrap_or_default();
+        for id in ids {
+            self.notify(Cancel::METHOD, json!({ "id": id }))?;
+        }
+        Ok(())
+    }
+
+    fn lock_vim_requests(&self) -> Result<std::sync::MutexGuard<HashMap<Id, Vec<Id>>>> {
+        self.vim_requests
+            .lock()
+            .map_err(|err| anyhow!("Failed to lock requests: {:?}", err))
+    }
+
     pub fn notify(&self, method: impl AsRef<str>, params: impl Serialize) -> Result<()> {
         let method = method.as_ref();
 
@@ -155,10 +246,26 @@ impl RpcClient {
     }
 }
 
+/// `[token, items]` of a `$/progress` notification reporting partial results of a request made
+/// with a `partialResultToken`, rather than the progress of some work.
+fn partial_result(notification: &jsonrpc_core::Notification) -> Option<Value> {
+    if notification.method != Progress::METHOD {
+        return None;
+    }
+    let params = match &notification.params {
+        jsonrpc_core::Params::Map(params) => params,
+        _ => return None,
+    };
+    let value = params.get("value").filter(|value| value.is_array())?;
+    let token = params.get("token").cloned().unwrap_or_default();
+    Some(json!([token, value]))
+}
+
 fn loop_read(
     reader: impl BufRead,
     reader_rx: Receiver<(Id, Sender<jsonrpc_core::Output>)>,
     sink: &Sender<Call>,
+    on_partial_result: &impl Fn(Value) -> Result<()>,
     language_id: &LanguageId,
 ) -> Result<()> {
     let mut pending_outputs = HashMap::new();
@@ -216,6 +323,7 @@ fn loop_read(
             );
             continue;
         }
+        logger::record("recv", language_id, &s);
         // TODO: cleanup.
         let message = message.unwrap();
         match message {
@@ -223,7 +331,13 @@ fn loop_read(
                 sink.send(Call::MethodCall(language_id.clone(), method_call))?;
             }
             RawMessage::Notification(notification) => {
-                sink.send(Call::Notification(language_id.clone(), notification))?;
+                // Notifications are handled on threads of their own, partial results are passed on
+                // from here instead so that they reach vim in order and before the response of
+                // their request.
+                match partial_result(&notification) {
+                    Some(partial_result) => on_partial_result(partial_result)?,
+                    None => sink.send(Call::Notification(language_id.clone(), notification))?,
+                }
             }
             RawMessage::Output(output) => {
                 while let Ok((id, tx)) = reader_rx.try_recv() {
@@ -231,8 +345,10 @@ fn loop_read(
                 }
 
                 if let Some(tx) = pending_outputs.remove(&output.id().to_int()?) {
-                    tx.send(output)
-                        .map_err(|output| anyhow!("Failed to send output: {:?}", output))?;
+                    // The caller is gone if the request timed out, that mustn't stop the reader.
+                    if let Err(output) = tx.send(output) {
+                        warn!("Dropped output of a request that timed out: {:?}", output);
+                    }
                 }
             }
         };
@@ -252,6 +368,7 @@ fn loop_write(
     for msg in rx.iter() {
         let s = serde_json::to_string(&msg)?;
         debug!("=> {:?} {}", language_id, s);
+        logger::record("send", language_id, &s);
         if language_id.is_none() {
             // Use different convention for two reasons,
             // 1. If using '\r\ncontent', nvim will receive output as `\r` + `content`, while vim
@@ -268,8 +385,9 @@ fn loop_write(
 
 #[cfg(test)]
 mod test {
-    use super::RE_REMOVE_EXTRA_FIELDS;
+    use super::{partial_result, RE_REMOVE_EXTRA_FIELDS};
     use crate::types::RawMessage;
+    use serde_json::json;
 
     #[test]
     // The library we're using for json-rpc doesn't accept extra fields in the structs used to
@@ -298,4 +416,27 @@ mod test {
         let result: Result<RawMessage, _> = serde_json::from_str(&message);
         assert!(result.is_ok());
     }
+
+    #[test]
+    fn test_partial_result() {
+        let notification = |params| {
+            serde_json::from_value(json!({
+                "jsonrpc": "2.0",
+                "method": "$/progress",
+                "params": params,
+            }))
+            .unwrap()
+        };
+
+        assert_eq!(
+            partial_result(&notification(
+                json!({"token": "t", "value": [{"name": "a"}]})
+            )),
+            Some(json!(["t", [{"name": "a"}]]))
+        );
+        assert_eq!(
+            partial_result(&notification(json!({"token": 1, "value": {"kind": "end"}}))),
+            None
+        );
+    }
 }
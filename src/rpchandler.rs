@@ -1,5 +1,7 @@
 use crate::extensions::clangd;
-use crate::{language_client::LanguageClient, language_server_protocol::Direction, types::*};
+use crate::{
+    language_client::LanguageClient, language_server_protocol::Direction, rpcclient, types::*,
+};
 use anyhow::{anyhow, Result};
 use log::*;
 use lsp_types::notification::{self, Notification};
@@ -13,13 +15,24 @@ fn is_content_modified_error(err: &anyhow::Error) -> bool {
     }
 }
 
+fn is_request_cancelled_error(err: &anyhow::Error) -> bool {
+    match err.downcast_ref::<LSError>() {
+        Some(err) if err == &LSError::RequestCancelled => true,
+        _ => false,
+    }
+}
+
 impl LanguageClient {
     pub fn handle_call(&self, msg: Call) -> Result<()> {
         match msg {
             Call::MethodCall(lang_id, method_call) => {
+                if lang_id.is_none() {
+                    rpcclient::set_vim_request_id(Some(method_call.id.to_int()?));
+                }
                 let result = self.handle_method_call(lang_id.as_deref(), &method_call);
                 if let Err(ref err) = result {
-                    if is_content_modified_error(err) {
+                    // Vim already dropped the handler of cancelled requests.
+                    if is_content_modified_error(err) || is_request_cancelled_error(err) {
                         return Ok(());
                     }
 
@@ -183,6 +196,9 @@ impl LanguageClient {
                 self.text_document_semantic_highlight(&params)?
             }
             notification::Progress::METHOD => self.progress(&params)?,
+            notification::Cancel::METHOD if language_id.is_none() => {
+                self.cancel_request(&params)?
+            }
             notification::LogMessage::METHOD => self.window_log_message(&params)?,
             notification::ShowMessage::METHOD => self.window_show_message(&params)?,
             notification::Exit::METHOD => self.exit(&params)?,
@@ -197,6 +213,7 @@ impl LanguageClient {
             NOTIFICATION_HANDLE_COMPLETE_DONE => self.handle_complete_done(&params)?,
             NOTIFICATION_FZF_SINK_LOCATION => self.fzf_sink_location(&params)?,
             NOTIFICATION_FZF_SINK_COMMAND => self.fzf_sink_command(&params)?,
+            NOTIFICATION_APPLY_CODE_ACTION => self.apply_code_action(&params)?,
             NOTIFICATION_CLEAR_DOCUMENT_HL => self.clear_document_highlight(&params)?,
             NOTIFICATION_LANGUAGE_STATUS => self.language_status(&params)?,
             NOTIFICATION_WINDOW_PROGRESS => self.window_progress(&params)?,
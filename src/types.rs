@@ -38,6 +38,8 @@ use thiserror::Error;
 pub enum LSError {
     #[error("Content Modified")]
     ContentModified,
+    #[error("Request Cancelled")]
+    RequestCancelled,
 }
 
 #[derive(Debug, Error)]
@@ -77,6 +79,7 @@ pub const NOTIFICATION_HANDLE_CURSOR_MOVED: &str = "languageClient/handleCursorM
 pub const NOTIFICATION_HANDLE_COMPLETE_DONE: &str = "languageClient/handleCompleteDone";
 pub const NOTIFICATION_FZF_SINK_LOCATION: &str = "LanguageClient_FZFSinkLocation";
 pub const NOTIFICATION_FZF_SINK_COMMAND: &str = "LanguageClient_FZFSinkCommand";
+pub const NOTIFICATION_APPLY_CODE_ACTION: &str = "languageClient/applyCodeAction";
 pub const NOTIFICATION_SERVER_EXITED: &str = "$languageClient/serverExited";
 pub const NOTIFICATION_CLEAR_DOCUMENT_HL: &str = "languageClient/clearDocumentHighlight";
 pub const NOTIFICATION_RUST_BEGIN_BUILD: &str = "rustDocument/beginBuild";
@@ -1000,16 +1003,30 @@ impl Filepath for Url {
 pub struct TextDocumentItemMetadata {
     #[serde(skip_serializing)]
     pub last_change: Instant,
+    /// b:changedtick of the text last synced with the server.
+    pub changedtick: Option<u64>,
 }
 
 impl Default for TextDocumentItemMetadata {
     fn default() -> Self {
         Self {
             last_change: Instant::now(),
+            changedtick: None,
         }
     }
 }
 
+/// Lines of a buffer changed since a given changedtick, as returned by LSP#textChanges: `lines`
+/// replace the lines `start` to `end` (exclusive, or to the end of the text when None) of the
+/// text at that changedtick.
+#[derive(Debug, Deserialize)]
+pub struct TextChanges {
+    pub changedtick: u64,
+    pub start: usize,
+    pub end: Option<usize>,
+    pub lines: Vec<String>,
+}
+
 pub trait ToLSP<T> {
     fn to_lsp(self) -> Result<T>;
 }
@@ -1,7 +1,9 @@
-use crate::types::{RootMarkers, ToUsize};
+use crate::types::{RootMarkers, TextChanges, ToUsize};
 use anyhow::{anyhow, Result};
 use log::*;
-use lsp_types::{CodeAction, Position, TextEdit, Url};
+use lsp_types::{
+    CodeAction, CodeActionOrCommand, Position, Range, TextDocumentContentChangeEvent, TextEdit, Url,
+};
 use serde_json::json;
 use serde_json::Value;
 use std::{
@@ -481,10 +483,103 @@ pub fn code_action_kind_as_str(action: &CodeAction) -> &str {
     }
 }
 
+/// Converts a Command into a CodeAction, so that the handling of both can be shared.
+pub fn into_code_action(action_or_command: CodeActionOrCommand) -> CodeAction {
+    match action_or_command {
+        CodeActionOrCommand::Command(command) => CodeAction {
+            title: command.title.clone(),
+            kind: Some(command.command.clone().into()),
+            diagnostics: None,
+            edit: None,
+            command: Some(command),
+            ..CodeAction::default()
+        },
+        CodeActionOrCommand::CodeAction(action) => action,
+    }
+}
+
+/// Applies the lines changed in vim to the lines last synced. Returns None if they don't fit,
+/// i.e. the changes were made to another version of the text.
+pub fn apply_text_changes<S: AsRef<str>>(
+    lines: &[S],
+    changes: &TextChanges,
+) -> Option<Vec<String>> {
+    let end = changes.end.unwrap_or_else(|| lines.len());
+    if changes.start > end || end > lines.len() {
+        return None;
+    }
+
+    let mut text = Vec::with_capacity(lines.len() - (end - changes.start) + changes.lines.len());
+    text.extend(lines[..changes.start].iter().map(|l| l.as_ref().to_owned()));
+    text.extend(changes.lines.iter().cloned());
+    text.extend(lines[end..].iter().map(|l| l.as_ref().to_owned()));
+    Some(text)
+}
+
+/// The incremental change turning the lines `old` into `new`: the smallest range of whole lines
+/// that differs between them. Returns None if they are the same.
+pub fn text_document_content_change<O: AsRef<str>, N: AsRef<str>>(
+    old: &[O],
+    new: &[N],
+) -> Option<TextDocumentContentChangeEvent> {
+    let prefix = old
+        .iter()
+        .zip(new)
+        .take_while(|(o, n)| o.as_ref() == n.as_ref())
+        .count();
+    let max_suffix = old.len().min(new.len()) - prefix;
+    let suffix = old
+        .iter()
+        .rev()
+        .zip(new.iter().rev())
+        .take(max_suffix)
+        .take_while(|(o, n)| o.as_ref() == n.as_ref())
+        .count();
+    let old_end = old.len() - suffix;
+    let new_lines = new[prefix..new.len() - suffix].iter().map(AsRef::as_ref);
+    if prefix == old_end && new_lines.len() == 0 {
+        return None;
+    }
+
+    let utf16_len = |line: &O| line.as_ref().encode_utf16().count() as u64;
+    let (range, text) = if old_end < old.len() {
+        // Replace whole lines, up to the start of the first unchanged one.
+        let range = Range::new(
+            Position::new(prefix as u64, 0),
+            Position::new(old_end as u64, 0),
+        );
+        (range, new_lines.map(|l| format!("{}\n", l)).collect())
+    } else if prefix > 0 {
+        // Replace everything after the last unchanged line, including its line break.
+        let range = Range::new(
+            Position::new(prefix as u64 - 1, utf16_len(&old[prefix - 1])),
+            Position::new(
+                old.len() as u64 - 1,
+                old.last().map(utf16_len).unwrap_or_default(),
+            ),
+        );
+        (range, new_lines.map(|l| format!("\n{}", l)).collect())
+    } else {
+        let range = Range::new(
+            Position::new(0, 0),
+            Position::new(
+                old.len().saturating_sub(1) as u64,
+                old.last().map(utf16_len).unwrap_or_default(),
+            ),
+        );
+        (range, new_lines.collect::<Vec<_>>().join("\n"))
+    };
+
+    Some(TextDocumentContentChangeEvent {
+        range: Some(range),
+        range_length: None,
+        text,
+    })
+}
+
 #[cfg(test)]
 mod test {
     use super::*;
-    use lsp_types::Range;
 
     #[test]
     fn test_escape_single_quote() {
@@ -769,4 +864,74 @@ mod test {
         assert_eq!(convert_to_vim_str("xyz'''ffff"), "'xyz''''''ffff'");
         assert_eq!(convert_to_vim_str("'''"), "''''''''");
     }
+
+    #[test]
+    fn test_apply_text_changes() {
+        let lines = vec!["a", "b", "c", ""];
+        let changes = |start, end, lines: &[&str]| TextChanges {
+            changedtick: 2,
+            start,
+            end,
+            lines: lines.iter().map(|l| l.to_string()).collect(),
+        };
+
+        assert_eq!(
+            apply_text_changes(&lines, &changes(1, Some(2), &["x", "y"])),
+            Some(vec![
+                "a".into(),
+                "x".into(),
+                "y".into(),
+                "c".into(),
+                "".into()
+            ])
+        );
+        assert_eq!(
+            apply_text_changes(&lines, &changes(2, None, &["z"])),
+            Some(vec!["a".into(), "b".into(), "z".into()])
+        );
+        assert_eq!(
+            apply_text_changes(&lines, &changes(0, None, &["new"])),
+            Some(vec!["new".into()])
+        );
+        assert_eq!(apply_text_changes(&lines, &changes(3, Some(5), &[])), None);
+        assert_eq!(apply_text_changes(&lines, &changes(3, Some(2), &[])), None);
+    }
+
+    #[test]
+    fn test_text_document_content_change() {
+        let change = |old: &[&str], new: &[&str]| {
+            text_document_content_change(old, new).map(|c| (c.range.unwrap(), c.text))
+        };
+        let range = |l1, c1, l2, c2| Range::new(Position::new(l1, c1), Position::new(l2, c2));
+
+        assert_eq!(change(&["a", "b", ""], &["a", "b", ""]), None);
+        // Changed line.
+        assert_eq!(
+            change(&["a", "b", "c"], &["a", "x", "c"]),
+            Some((range(1, 0, 2, 0), "x\n".into()))
+        );
+        // Inserted and deleted lines.
+        assert_eq!(
+            change(&["a", "c", ""], &["a", "b", "c", ""]),
+            Some((range(1, 0, 1, 0), "b\n".into()))
+        );
+        assert_eq!(
+            change(&["a", "b", "c"], &["a", "c"]),
+            Some((range(1, 0, 2, 0), "".into()))
+        );
+        // Changes at the end of the text.
+        assert_eq!(
+            change(&["a", "b", "c"], &["a"]),
+            Some((range(0, 1, 2, 1), "".into()))
+        );
+        assert_eq!(
+            change(&["a"], &["a", "b"]),
+            Some((range(0, 1, 0, 1), "\nb".into()))
+        );
+        // Whole text, with lengths in UTF-16 code units.
+        assert_eq!(
+            change(&["a\u{1F600}"], &["b", "c"]),
+            Some((range(0, 0, 0, 3), "b\nc".into()))
+        );
+    }
 }
@@ -1,7 +1,7 @@
 use crate::{
     rpcclient::RpcClient,
     sign::Sign,
-    types::{Bufnr, QuickfixEntry, VimExp, VirtualText},
+    types::{Bufnr, QuickfixEntry, TextChanges, VimExp, VirtualText},
     utils::Canonicalize,
     viewport::Viewport,
 };
@@ -169,8 +169,11 @@ impl Vim {
         Ok(insert_spaces == 1)
     }
 
-    pub fn get_text(&self, bufname: &str) -> Result<Vec<String>> {
-        self.rpcclient.call("LSP#text", json!([bufname]))
+    /// Lines changed in `bufname` since `changedtick`, or its whole text if vim doesn't know the
+    /// changes since then.
+    pub fn get_text_changes(&self, bufname: &str, changedtick: Option<u64>) -> Result<TextChanges> {
+        self.rpcclient
+            .call("LSP#textChanges", json!([bufname, changedtick]))
     }
 
     pub fn get_handle(&self, params: &Value) -> Result<bool> {
@@ -177,6 +177,36 @@ def test_textDocument_references_modified_buffer(nvim):
     nvim.command("edit! {}".format(PATH_MAIN_RS))
 
 
+def test_textDocument_definition_after_line_edits(nvim):
+    nvim.command("edit! {}".format(PATH_MAIN_RS))
+    time.sleep(1)
+    # Two lines inserted, one deleted and the deletion undone above
+    # fn greet, which ends up 2 lines below where it started.
+    nvim.funcs.cursor(6, 1)
+    nvim.input("o// one<CR>// two<Esc>")
+    time.sleep(1)
+    nvim.input("4Gdd")
+    time.sleep(1)
+    nvim.input("u")
+    time.sleep(1)
+
+    assert nvim.current.buffer[9] == "fn greet() -> i32 {"
+
+    nvim.funcs.cursor(3, 22)
+    nvim.funcs.LanguageClient_textDocument_definition()
+    time.sleep(3)
+
+    assert nvim.current.window.cursor == [10, 3]
+
+    nvim.funcs.LanguageClient_textDocument_hover()
+    time.sleep(1)
+    buf = getLanguageClientBuffers(nvim)[0]
+
+    assert "fn greet() -> i32" in "\n".join(buf)
+
+    nvim.command("edit! {}".format(PATH_MAIN_RS))
+
+
 def test_languageClient_registerServerCommands(nvim):
     nvim.command("edit! {}".format(PATH_MAIN_RS))
     time.sleep(1)
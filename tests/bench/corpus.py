@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Generate synthetic projects shaped like the tests/data/sample-* projects,
+scaled up to any number of files and symbols.
+
+Every module defines --symbols functions calling one shared function, so a
+corpus of --files modules has files * symbols workspace symbols and as many
+references to the shared function:
+
+    python3 tests/bench/corpus.py --language rust --files 2000 \\
+        --symbols 100 /tmp/corpus-rs
+
+The layout of the corpus is described in corpus.json at its root, which
+throughput.py and corpus_server.py read.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+from typing import Any, Callable, Dict, List, NamedTuple
+
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "data")
+MANIFEST = "corpus.json"
+
+
+class Language(NamedTuple):
+    filetype: str
+    # Project files copied from tests/data/sample-{sample}.
+    sample: str
+    project_files: List[str]
+    # Extra project files, path => content.
+    extra_files: Dict[str, str]
+    entry: str
+    shared: str
+    module: str
+    shared_name: str
+    # (module index, symbol index) => function name.
+    symbol_name: Callable[[int, int], str]
+    # Line prefixes of the definitions, as matched by corpus_server.py.
+    definition: str
+    render_entry: Callable[[List[str]], str]
+    render_shared: Callable[[], str]
+    # [(function name, value, filler lines)] => module text.
+    render_module: Callable[[List[Any]], str]
+
+
+def rust_entry(modules: List[str]) -> str:
+    mods = "".join("mod {};\n".format(os.path.splitext(
+        os.path.basename(m))[0]) for m in modules)
+    return ("mod shared;\n" + mods + "\nfn main() {\n"
+            "    println!(\"{}\", shared::shared_value());\n}\n")
+
+
+def rust_module(symbols: List[Any]) -> str:
+    return "\n".join(
+        "pub fn {}() -> i32 {{\n{}    crate::shared::shared_value() + {}\n"
+        "}}\n".format(name, "".join(
+            "    let _x{0} = {0};\n".format(i) for i in range(filler)), value)
+        for name, value, filler in symbols)
+
+
+def typescript_module(symbols: List[Any]) -> str:
+    return 'import { sharedValue } from "./shared";\n\n' + "\n".join(
+        "export function {}(): number {{\n{}    return sharedValue() + {};\n"
+        "}}\n".format(name, "".join(
+            "    const x{0} = {0};\n".format(i) for i in range(filler)),
+            value)
+        for name, value, filler in symbols)
+
+
+def python_module(symbols: List[Any]) -> str:
+    return "from .shared import shared_value\n\n\n" + "\n\n".join(
+        "def {}():\n{}    return shared_value() + {}\n".format(name, "".join(
+            "    x{0} = {0}\n".format(i) for i in range(filler)), value)
+        for name, value, filler in symbols)
+
+
+def go_module(symbols: List[Any]) -> str:
+    return "package main\n\n" + "\n".join(
+        "func {}() int {{\n{}\treturn sharedValue() + {}\n}}\n".format(
+            name, "".join("\t_ = {}\n".format(i) for i in range(filler)),
+            value)
+        for name, value, filler in symbols)
+
+
+LANGUAGES = {
+    "rust": Language(
+        filetype="rust",
+        sample="rs",
+        project_files=["Cargo.toml"],
+        extra_files={},
+        entry="src/main.rs",
+        shared="src/shared.rs",
+        module="src/m{:05d}.rs",
+        shared_name="shared_value",
+        symbol_name="f_{:05d}_{}".format,
+        definition="pub fn ",
+        render_entry=rust_entry,
+        render_shared=lambda: "pub fn shared_value() -> i32 {\n    42\n}\n",
+        render_module=rust_module,
+    ),
+    "typescript": Language(
+        filetype="typescript",
+        sample="ts",
+        project_files=["package.json"],
+        extra_files={},
+        entry="index.ts",
+        shared="src/shared.ts",
+        module="src/m{:05d}.ts",
+        shared_name="sharedValue",
+        symbol_name="f{:05d}_{}".format,
+        definition="export function ",
+        render_entry=lambda modules: (
+            'import { sharedValue } from "./src/shared";\n\n'
+            "console.log(sharedValue());\n"),
+        render_shared=lambda: (
+            "export function sharedValue(): number {\n    return 42;\n}\n"),
+        render_module=typescript_module,
+    ),
+    "python": Language(
+        filetype="python",
+        sample="py",
+        project_files=["setup.py"],
+        extra_files={"corpus/__init__.py": ""},
+        entry="corpus/__main__.py",
+        shared="corpus/shared.py",
+        module="corpus/m{:05d}.py",
+        shared_name="shared_value",
+        symbol_name="f_{:05d}_{}".format,
+        definition="def ",
+        render_entry=lambda modules: (
+            "from .shared import shared_value\n\nprint(shared_value())\n"),
+        render_shared=lambda: "def shared_value():\n    return 42\n",
+        render_module=python_module,
+    ),
+    "go": Language(
+        filetype="go",
+        sample="go",
+        project_files=[],
+        extra_files={"go.mod": "module corpus\n\ngo 1.14\n"},
+        entry="main.go",
+        shared="shared.go",
+        module="m{:05d}.go",
+        shared_name="sharedValue",
+        symbol_name="f{:05d}_{}".format,
+        definition="func ",
+        render_entry=lambda modules: (
+            'package main\n\nimport "fmt"\n\nfunc main() {\n'
+            "\tfmt.Println(sharedValue())\n}\n"),
+        render_shared=lambda: (
+            "package main\n\nfunc sharedValue() int {\n\treturn 42\n}\n"),
+        render_module=go_module,
+    ),
+}
+
+
+def write(root: str, path: str, text: str) -> None:
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def generate(language: str, root: str, files: int, symbols: int,
+             seed: int = 0) -> Dict[str, Any]:
+    """Write the corpus to root and return its manifest."""
+    lang = LANGUAGES[language]
+    rng = random.Random(seed)
+    sample = os.path.join(SAMPLES, "sample-" + lang.sample)
+    for path in lang.project_files:
+        os.makedirs(root, exist_ok=True)
+        shutil.copy(os.path.join(sample, path), os.path.join(root, path))
+    for path, text in lang.extra_files.items():
+        write(root, path, text)
+
+    modules = [lang.module.format(i) for i in range(files)]
+    for i, module in enumerate(modules):
+        # Functions of 1 to 5 lines, so that files aren't all alike.
+        write(root, module, lang.render_module([
+            (lang.symbol_name(i, j), rng.randrange(1000), rng.randrange(5))
+            for j in range(symbols)]))
+    write(root, lang.entry, lang.render_entry(modules))
+    shared = lang.render_shared()
+    write(root, lang.shared, shared)
+
+    definition = shared.splitlines().index(next(
+        line for line in shared.splitlines()
+        if line.startswith(lang.definition)))
+    manifest = {
+        "language": language,
+        "filetype": lang.filetype,
+        "files": files,
+        "symbolsPerFile": symbols,
+        "symbols": files * symbols + 1,
+        "seed": seed,
+        "entry": lang.entry,
+        "modules": modules,
+        # Definition of the shared function, called once per symbol and once
+        # from the entry file.
+        "shared": {
+            "path": lang.shared,
+            "name": lang.shared_name,
+            "line": definition,
+            "character": shared.splitlines()[definition].index(
+                lang.shared_name),
+            "references": files * symbols + 1,
+        },
+    }
+    with open(os.path.join(root, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load(root: str) -> Dict[str, Any]:
+    with open(os.path.join(root, MANIFEST)) as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="directory to write the corpus to")
+    parser.add_argument("--language", choices=sorted(LANGUAGES),
+                        default="rust")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--symbols", type=int, default=100,
+                        help="functions per file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.exists(os.path.join(args.root, MANIFEST)):
+        print("{} already holds a corpus.".format(args.root))
+        return 1
+    manifest = generate(args.language, args.root, args.files, args.symbols,
+                        args.seed)
+    print("{}: {} files, {} symbols".format(
+        args.root, manifest["files"] + 2, manifest["symbols"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
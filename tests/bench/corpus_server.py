@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Language server stand-in answering from the index of a corpus made with
+corpus.py, so that the client can be measured on large projects without
+the cost of a real server.
+
+Use it as the server command of the corpus filetype:
+
+    let g:LanguageClient_serverCommands = {
+        \\ 'rust': ['python3', 'tests/bench/corpus_server.py',
+        \\          '/tmp/corpus-rs'],
+        \\ }
+
+It answers workspace/symbol, textDocument/documentSymbol and
+textDocument/references, and corpus/stats with the number and size of the
+document notifications it received. Servers are asked for incremental
+changes unless --full-sync is given. With --partial-results N, symbols and
+references are streamed N at a time to requests with a partialResultToken.
+"""
+import argparse
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+from urllib import parse, request
+
+import corpus
+from replay_server import log, read_message, write_message
+
+
+SYMBOL_KIND_FUNCTION = 12
+
+
+def path_to_uri(path: str) -> str:
+    return parse.urljoin("file:", request.pathname2url(path))
+
+
+def location(uri: str, line: int, start: int, end: int) -> Dict[str, Any]:
+    return {
+        "uri": uri,
+        "range": {
+            "start": {"line": line, "character": start},
+            "end": {"line": line, "character": end},
+        },
+    }
+
+
+class Index:
+    def __init__(self, root: str) -> None:
+        manifest = corpus.load(root)
+        language = corpus.LANGUAGES[manifest["language"]]
+        definition = re.compile(
+            r"^{}(\w+)".format(re.escape(language.definition)))
+
+        # uri => lines
+        self.texts: Dict[str, List[str]] = {}
+        self.symbols: List[Dict[str, Any]] = []
+        self.symbols_by_uri: Dict[str, List[Dict[str, Any]]] = {}
+        self.references: Dict[str, List[Dict[str, Any]]] = {}
+        paths = [manifest["entry"], manifest["shared"]["path"]]
+        for path in paths + manifest["modules"]:
+            uri = path_to_uri(os.path.join(os.path.abspath(root), path))
+            with open(os.path.join(root, path)) as f:
+                lines = f.read().splitlines()
+            self.texts[uri] = lines
+            symbols = self.symbols_by_uri.setdefault(uri, [])
+            for number, line in enumerate(lines):
+                match = definition.match(line)
+                if match:
+                    symbols.append({
+                        "name": match.group(1),
+                        "kind": SYMBOL_KIND_FUNCTION,
+                        "location": location(uri, number, match.start(1),
+                                             match.end(1)),
+                    })
+            self.symbols += symbols
+
+    def word_at(self, uri: str, line: int, character: int) -> Optional[str]:
+        lines = self.texts.get(uri, [])
+        if line >= len(lines):
+            return None
+        for match in re.finditer(r"\w+", lines[line]):
+            if match.start() <= character <= match.end():
+                return match.group()
+        return None
+
+    def find_references(self, word: str) -> List[Dict[str, Any]]:
+        if word not in self.references:
+            pattern = re.compile(r"\b{}\b".format(re.escape(word)))
+            self.references[word] = [
+                location(uri, number, match.start(), match.end())
+                for uri, lines in self.texts.items()
+                for number, line in enumerate(lines)
+                if word in line
+                for match in pattern.finditer(line)
+            ]
+        return self.references[word]
+
+
+class Server:
+    def __init__(self, index: Index, out, full_sync: bool,
+                 partial_results: int, symbol_limit: int) -> None:
+        self.index = index
+        self.out = out
+        self.full_sync = full_sync
+        self.partial_results = partial_results
+        self.symbol_limit = symbol_limit
+        self.stats = {
+            "didOpen": 0,
+            "didOpenBytes": 0,
+            "didChange": 0,
+            "didChangeBytes": 0,
+            "fullChanges": 0,
+            "incrementalChanges": 0,
+            "didClose": 0,
+        }
+
+    def respond(self, params: Dict[str, Any], items: List[Any]) -> Any:
+        """items, streamed in chunks first if the request asked for it."""
+        token = params.get("partialResultToken")
+        if token is None or not self.partial_results:
+            return items
+        for start in range(0, len(items), self.partial_results):
+            write_message(self.out, {
+                "jsonrpc": "2.0",
+                "method": "$/progress",
+                "params": {
+                    "token": token,
+                    "value": items[start:start + self.partial_results],
+                },
+            })
+        return []
+
+    def initialize(self, params: Dict[str, Any]) -> Any:
+        return {
+            "capabilities": {
+                "textDocumentSync": {
+                    "openClose": True,
+                    "change": 1 if self.full_sync else 2,
+                },
+                "workspaceSymbolProvider": True,
+                "documentSymbolProvider": True,
+                "referencesProvider": True,
+            },
+            "serverInfo": {"name": "corpus_server"},
+        }
+
+    def workspace_symbol(self, params: Dict[str, Any]) -> Any:
+        query = params.get("query", "").lower()
+        symbols = [s for s in self.index.symbols
+                   if query in s["name"].lower()]
+        if self.symbol_limit:
+            symbols = symbols[:self.symbol_limit]
+        return self.respond(params, symbols)
+
+    def document_symbol(self, params: Dict[str, Any]) -> Any:
+        uri = params["textDocument"]["uri"]
+        return self.respond(params, self.index.symbols_by_uri.get(uri, []))
+
+    def references(self, params: Dict[str, Any]) -> Any:
+        position = params["position"]
+        word = self.index.word_at(params["textDocument"]["uri"],
+                                  position["line"], position["character"])
+        if word is None:
+            return []
+        return self.respond(params, self.index.find_references(word))
+
+    def did_open(self, params: Dict[str, Any]) -> None:
+        self.stats["didOpen"] += 1
+        self.stats["didOpenBytes"] += len(
+            params["textDocument"]["text"].encode("utf-8"))
+
+    def did_change(self, params: Dict[str, Any]) -> None:
+        self.stats["didChange"] += 1
+        for change in params["contentChanges"]:
+            self.stats["didChangeBytes"] += len(change["text"].encode("utf-8"))
+            if change.get("range") is not None:
+                self.stats["incrementalChanges"] += 1
+            else:
+                self.stats["fullChanges"] += 1
+
+    def did_close(self, params: Dict[str, Any]) -> None:
+        self.stats["didClose"] += 1
+
+    def handle(self, message: Dict[str, Any]) -> bool:
+        """Returns whether to keep serving."""
+        method = message.get("method")
+        params = message.get("params") or {}
+        requests = {
+            "initialize": self.initialize,
+            "workspace/symbol": self.workspace_symbol,
+            "textDocument/documentSymbol": self.document_symbol,
+            "textDocument/references": self.references,
+            "corpus/stats": lambda params: self.stats,
+        }
+        notifications = {
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+        }
+
+        if method == "exit":
+            return False
+        if "id" not in message:
+            if method in notifications:
+                notifications[method](params)
+            return True
+
+        result = None
+        if method in requests:
+            result = requests[method](params)
+        elif method != "shutdown":
+            log("no answer to {}".format(method))
+        write_message(self.out, {
+            "jsonrpc": "2.0",
+            "id": message["id"],
+            "result": result,
+        })
+        return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", help="directory made with corpus.py")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="ask for the whole text on every change")
+    parser.add_argument("--partial-results", type=int, default=0,
+                        metavar="N", help="stream results N at a time")
+    parser.add_argument("--symbol-limit", type=int, default=0,
+                        help="return at most this many workspace symbols")
+    args = parser.parse_args()
+
+    server = Server(Index(args.corpus), sys.stdout.buffer, args.full_sync,
+                    args.partial_results, args.symbol_limit)
+    while True:
+        message = read_message(sys.stdin.buffer)
+        if message is None or not server.handle(message):
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
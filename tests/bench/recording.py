@@ -0,0 +1,68 @@
+"""Reading of the JSON-RPC recordings made with g:LanguageClient_recordingFile.
+
+Every line of a recording is a JSON object:
+
+    {"time": 1.25, "direction": "send", "languageId": "rust", "message": {...}}
+
+`direction` is from the point of view of the client: `send` messages went to
+the language server (or to vim, when `languageId` is null) and `recv`
+messages came from it.
+"""
+import json
+from typing import Any, Dict, List, Optional
+from urllib import parse, request
+
+
+Entry = Dict[str, Any]
+
+
+def uri_to_path(uri: str) -> str:
+    return request.url2pathname(parse.urlparse(uri).path)
+
+
+class Recording:
+    def __init__(self, entries: List[Entry]) -> None:
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        entries = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+        return cls(entries)
+
+    def language_ids(self) -> List[str]:
+        ids: List[str] = []
+        for entry in self.entries:
+            language_id = entry["languageId"]
+            if language_id is not None and language_id not in ids:
+                ids.append(language_id)
+        return ids
+
+    def server_traffic(self, language_id: str) -> List[Entry]:
+        """Messages exchanged with the server of `language_id`, in order."""
+        return [e for e in self.entries if e["languageId"] == language_id]
+
+    def requests(self, language_id: str, method: str) -> List[Entry]:
+        """Requests of `method` sent to the server of `language_id`."""
+        return [
+            e for e in self.server_traffic(language_id)
+            if e["direction"] == "send"
+            and e["message"].get("method") == method
+            and "id" in e["message"]
+        ]
+
+    def response(self, language_id: str, request: Entry) -> Optional[Entry]:
+        """The recorded response to `request`, if any."""
+        traffic = self.server_traffic(language_id)
+        start = traffic.index(request)
+        request_id = request["message"]["id"]
+        for entry in traffic[start + 1:]:
+            message = entry["message"]
+            if (entry["direction"] == "recv" and "method" not in message
+                    and message.get("id") == request_id):
+                return entry
+        return None
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Language server stand-in that plays back a recording made with
+g:LanguageClient_recordingFile.
+
+Use it as the server command of the recorded filetype:
+
+    let g:LanguageClient_serverCommands = {
+        \\ 'rust': ['python3', 'tests/bench/replay_server.py',
+        \\          '--language-id', 'rust', 'session.jsonl'],
+        \\ }
+
+Every message the recorded server sent is played back once the client
+message that preceded it in the recording has been received again. Client
+messages are matched by method, in order; responses get the id of the live
+request they answer, and partial results the partialResultToken of the live
+request they belong to. With `--speed realtime` messages keep their recorded
+delay relative to that client message, with `--speed full` they are sent
+right away.
+"""
+import argparse
+import collections
+import heapq
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from recording import Entry, Recording
+
+
+def log(message: str) -> None:
+    print("replay: " + message, file=sys.stderr, flush=True)
+
+
+def read_message(stream) -> Optional[Dict[str, Any]]:
+    """The next JSON-RPC message of stream, None at the end of it."""
+    content_length = 0
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.lower() == "content-length":
+            content_length = int(value)
+    return json.loads(stream.read(content_length).decode("utf-8"))
+
+
+def read_messages(stream, inbox: queue.Queue) -> None:
+    while True:
+        message = read_message(stream)
+        inbox.put(message)
+        if message is None:
+            return
+
+
+def write_message(stream, message: Dict[str, Any]) -> None:
+    content = json.dumps(message).encode("utf-8")
+    stream.write(b"Content-Length: %d\r\n\r\n" % len(content))
+    stream.write(content)
+    stream.flush()
+
+
+def partial_result_token(message: Dict[str, Any]) -> Any:
+    params = message.get("params")
+    if not isinstance(params, dict):
+        return None
+    return params.get("partialResultToken")
+
+
+class Replay:
+    def __init__(self, traffic: List[Entry], realtime: bool) -> None:
+        self.realtime = realtime
+        # Recorded client messages (requests and notifications) per method,
+        # waiting to be matched against live ones.
+        self.expected: Dict[str, Deque[int]] = collections.defaultdict(
+            collections.deque)
+        # Recorded index of a client message => (live time, live id).
+        self.matched: Dict[int, Tuple[float, Any]] = {}
+        # Recorded server messages waiting for their trigger, by trigger.
+        self.waiting: Dict[Optional[int], List[int]] = collections.defaultdict(
+            list)
+        # Recorded index of a response => recorded index of its request.
+        self.response_to: Dict[int, int] = {}
+        # Recorded partialResultToken => live one.
+        self.tokens: Dict[Any, Any] = {}
+        # Last recorded response per method, reused for extra requests.
+        self.last_response: Dict[str, int] = {}
+        # (due time, recorded index, live id of the request it answers)
+        self.scheduled: List[Tuple[float, int, Any]] = []
+        self.traffic = traffic
+
+        trigger: Optional[int] = None
+        requests_by_id: Dict[Any, int] = {}
+        for index, entry in enumerate(traffic):
+            message = entry["message"]
+            if entry["direction"] == "send":
+                if "method" not in message:
+                    # Response to a server request, nothing to wait for.
+                    continue
+                self.expected[message["method"]].append(index)
+                if "id" in message:
+                    requests_by_id[message["id"]] = index
+                trigger = index
+            elif "method" in message:
+                self.waiting[trigger].append(index)
+            elif message.get("id") in requests_by_id:
+                request = requests_by_id[message["id"]]
+                self.response_to[index] = request
+                self.last_response[traffic[request]["message"]["method"]] = \
+                    index
+                self.waiting[request].append(index)
+            else:
+                self.waiting[trigger].append(index)
+
+        self.start = time.monotonic()
+        self.release(None)
+
+    def release(self, trigger: Optional[int]) -> None:
+        if trigger is None:
+            live_time = self.start
+            recorded_time = self.traffic[0]["time"] if self.traffic else 0
+        else:
+            live_time = self.matched[trigger][0]
+            recorded_time = self.traffic[trigger]["time"]
+
+        for index in self.waiting.pop(trigger, []):
+            live_id = None
+            if index in self.response_to:
+                live_id = self.matched[self.response_to[index]][1]
+            self.schedule(index, live_time, recorded_time, live_id)
+
+    def schedule(self, index: int, live_time: float, recorded_time: float,
+                 live_id: Any) -> None:
+        due = live_time
+        if self.realtime:
+            due += max(0.0, self.traffic[index]["time"] - recorded_time)
+        heapq.heappush(self.scheduled, (due, index, live_id))
+
+    def receive(self, message: Dict[str, Any], out) -> None:
+        method = message.get("method")
+        if method is None:
+            return
+
+        pending = self.expected.get(method)
+        if pending:
+            index = pending.popleft()
+            self.matched[index] = (time.monotonic(), message.get("id"))
+            token = partial_result_token(self.traffic[index]["message"])
+            if token is not None:
+                self.tokens[token] = partial_result_token(message)
+            self.release(index)
+        elif "id" in message and method in self.last_response:
+            log("no recorded request left for {}, repeating the last "
+                "response".format(method))
+            index = self.last_response[method]
+            recorded_time = self.traffic[self.response_to[index]]["time"]
+            self.schedule(index, time.monotonic(), recorded_time,
+                          message["id"])
+        elif "id" in message:
+            log("no recorded response for {}".format(method))
+            write_message(out, {
+                "jsonrpc": "2.0",
+                "id": message["id"],
+                "result": None,
+            })
+
+    def timeout(self) -> Optional[float]:
+        if not self.scheduled:
+            return None
+        return max(0.0, self.scheduled[0][0] - time.monotonic())
+
+    def flush(self, out) -> None:
+        while self.scheduled and self.scheduled[0][0] <= time.monotonic():
+            _, index, live_id = heapq.heappop(self.scheduled)
+            message = dict(self.traffic[index]["message"])
+            if index in self.response_to:
+                message["id"] = live_id
+            elif message.get("method") == "$/progress":
+                params = dict(message.get("params") or {})
+                if params.get("token") in self.tokens:
+                    params["token"] = self.tokens[params["token"]]
+                    message["params"] = params
+            write_message(out, message)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording")
+    parser.add_argument("--language-id",
+                        help="server to play back, defaults to the first one")
+    parser.add_argument("--speed", choices=("realtime", "full"),
+                        default="full")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.recording)
+    language_id = args.language_id or next(iter(recording.language_ids()),
+                                           None)
+    if language_id is None:
+        log("no language server traffic in {}".format(args.recording))
+        return 1
+
+    replay = Replay(recording.server_traffic(language_id),
+                    args.speed == "realtime")
+
+    inbox: queue.Queue = queue.Queue()
+    reader = threading.Thread(target=read_messages,
+                              args=(sys.stdin.buffer, inbox), daemon=True)
+    reader.start()
+
+    out = sys.stdout.buffer
+    while True:
+        replay.flush(out)
+        try:
+            message = inbox.get(timeout=replay.timeout())
+        except queue.Empty:
+            continue
+        if message is None or message.get("method") == "exit":
+            return 0
+        replay.receive(message, out)
+
+
+if __name__ == "__main__":
+    # Don't wait for the reader thread, which is blocked on stdin.
+    os._exit(main())
@@ -0,0 +1,126 @@
+"""Load this plugin's denite/deoplete sources the way the remote plugin host
+does, so they can be timed and driven outside of denite/deoplete."""
+import importlib.util
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import neovim
+
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+RPLUGIN_PATH = os.path.join(project_root, "rplugin", "python3")
+
+# tests/data/vimrc with denite and deoplete installed.
+VIMRC = os.path.join(project_root, "tests", "bench", "vimrc")
+
+NVIM_LISTEN_ADDRESS = os.environ.get(
+    "NVIM_LISTEN_ADDRESS", "/tmp/nvim-LanguageClient-IntegrationTest")
+
+SOURCES = {
+    "denite": [
+        "codeAction",
+        "contextMenu",
+        "documentSymbol",
+        "references",
+        "workspaceSymbol",
+    ],
+    "deoplete": [
+        "LanguageClientSource",
+    ],
+}
+
+# Modules imported lazily by the sources. Dropped between rounds so every
+# round measures a cold load.
+LAZY_MODULES = ["common", "lsp", "lsp.protocol"]
+
+
+def attach() -> neovim.Nvim:
+    return neovim.attach("socket", path=NVIM_LISTEN_ADDRESS)
+
+
+def add_host_paths(nvim: neovim.Nvim) -> List[str]:
+    """Put the rplugin/python3 directories of every plugin loaded by nvim on
+    sys.path, as the python3 host does. Returns the plugins found."""
+    paths = nvim.funcs.globpath(
+        nvim.options["runtimepath"], "rplugin/python3", 0, 1)
+    for path in paths:
+        if path not in sys.path:
+            sys.path.append(path)
+
+    found = []
+    for plugin in SOURCES:
+        try:
+            importlib.import_module("{}.source.base".format(plugin))
+            found.append(plugin)
+        except ImportError:
+            pass
+    return found
+
+
+def source_path(plugin: str, name: str) -> str:
+    subdir = "source" if plugin == "denite" else "sources"
+    return os.path.join(RPLUGIN_PATH, plugin, subdir, name + ".py")
+
+
+def import_source(plugin: str, name: str) -> Any:
+    module_name = "{}.source.{}".format(plugin, name)
+    spec = importlib.util.spec_from_file_location(
+        module_name, source_path(plugin, name))
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_source(nvim: neovim.Nvim, plugin: str, name: str) -> Any:
+    return import_source(plugin, name).Source(nvim)
+
+
+def unload_lazy_modules() -> None:
+    for module in LAZY_MODULES:
+        sys.modules.pop(module, None)
+
+
+def denite_context(nvim: neovim.Nvim, **kwargs: Any) -> Dict[str, Any]:
+    """The subset of a denite context the sources of this plugin read."""
+    context = {
+        "args": [],
+        "bufnr": nvim.current.buffer.number,
+        "input": "",
+        "is_async": False,
+        "is_interactive": False,
+    }
+    context.update(kwargs)
+    return context
+
+
+def deoplete_context(nvim: neovim.Nvim, **kwargs: Any) -> Dict[str, Any]:
+    """The subset of a deoplete context the sources of this plugin read."""
+    context = {
+        "bufnr": nvim.current.buffer.number,
+        "complete_position": nvim.funcs.col(".") - 1,
+        "complete_str": "",
+        "filetype": nvim.current.buffer.options["filetype"],
+        "is_async": False,
+    }
+    context.update(kwargs)
+    return context
+
+
+def gather(source: Any, context: Dict[str, Any],
+           timeout: float = 60) -> List[Dict]:
+    """Call gather_candidates the way denite/deoplete do, until the source
+    stops being asynchronous."""
+    candidates = source.gather_candidates(context)
+    deadline = time.monotonic() + timeout
+    while context["is_async"]:
+        if time.monotonic() > deadline:
+            raise TimeoutError(
+                "source still async after {}s".format(timeout))
+        time.sleep(0.01)
+        candidates += source.gather_candidates(context)
+    return candidates
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Measure how long the remote plugin host spends loading the denite and
+deoplete sources of this plugin.
+
+Each round imports and instantiates every source from scratch, against a
+running nvim (see tests/bench/vimrc), the same way denite/deoplete do:
+
+    NVIM_LISTEN_ADDRESS=/tmp/nvim-LanguageClient-IntegrationTest \\
+        nvim -n -u tests/bench/vimrc --headless &
+    python3 tests/bench/startup.py --rounds 20
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import rplugin
+
+
+def measure(nvim, plugins: List[str], rounds: int) -> Dict[str, Dict]:
+    timings: Dict[str, List[float]] = {}
+    for _ in range(rounds):
+        rplugin.unload_lazy_modules()
+        for plugin in plugins:
+            for name in rplugin.SOURCES[plugin]:
+                start = time.perf_counter()
+                rplugin.load_source(nvim, plugin, name)
+                elapsed = (time.perf_counter() - start) * 1000
+                key = "{}/{}".format(plugin, name)
+                timings.setdefault(key, []).append(elapsed)
+
+    return {
+        key: {
+            "min_ms": min(samples),
+            "median_ms": statistics.median(samples),
+            "max_ms": max(samples),
+        }
+        for key, samples in timings.items()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    nvim = rplugin.attach()
+    plugins = rplugin.add_host_paths(nvim)
+    if not plugins:
+        print("Neither denite nor deoplete found in nvim's runtimepath.")
+        return 1
+
+    results = measure(nvim, plugins, args.rounds)
+    total = sum(r["median_ms"] for r in results.values())
+    for key, r in sorted(results.items()):
+        print("{:<36} min {:8.3f}ms  median {:8.3f}ms  max {:8.3f}ms".format(
+            key, r["min_ms"], r["median_ms"], r["max_ms"]))
+    print("{:<36} median {:8.3f}ms".format("total", total))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "rounds": args.rounds,
+                "sources": results,
+                "total_median_ms": total,
+            }, f, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Re-run the denite/deoplete sources of this plugin against recorded language
+server sessions and report the latency of every operation.
+
+Recordings are made with g:LanguageClient_recordingFile and looked up in
+tests/bench/recordings/*.jsonl, or in the files listed in
+$LC_REPLAY_RECORDINGS (separated by os.pathsep). Every recorded request the
+sources know how to issue becomes one operation, replayed at the cursor
+position it was recorded at:
+
+    LC_REPLAY_SPEED=realtime LC_REPLAY_REPORT=replay.json \\
+        pytest --capture=no tests/bench/test_replay.py
+
+$LC_REPLAY_SPEED is `full` (default) to answer right away, or `realtime` to
+keep the recorded server delays. $LC_REPLAY_REPORT names a file to write the
+results to as JSON.
+"""
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import neovim
+import pytest
+
+import rplugin
+from recording import Entry, Recording, uri_to_path
+
+
+BENCH_ROOT = os.path.dirname(os.path.abspath(__file__))
+REPLAY_SERVER = os.path.join(BENCH_ROOT, "replay_server.py")
+
+SPEED = os.environ.get("LC_REPLAY_SPEED", "full")
+REPORT = os.environ.get("LC_REPLAY_REPORT")
+
+# LSP method => (plugin, source) issuing it.
+OPERATIONS = {
+    "textDocument/references": ("denite", "references"),
+    "textDocument/documentSymbol": ("denite", "documentSymbol"),
+    "workspace/symbol": ("denite", "workspaceSymbol"),
+    "textDocument/codeAction": ("denite", "codeAction"),
+    "textDocument/completion": ("deoplete", "LanguageClientSource"),
+}
+
+GATHER_TIMEOUT = 60
+
+
+def recording_paths() -> List[str]:
+    paths = os.environ.get("LC_REPLAY_RECORDINGS")
+    if paths:
+        return [p for p in paths.split(os.pathsep) if p]
+    return sorted(glob.glob(os.path.join(BENCH_ROOT, "recordings", "*.jsonl")))
+
+
+def operations() -> List[Tuple[str, str, Entry]]:
+    """(recording path, language id, request) of every replayable request."""
+    ops = []
+    for path in recording_paths():
+        recording = Recording.load(path)
+        for language_id in recording.language_ids():
+            for method in OPERATIONS:
+                for request in recording.requests(language_id, method):
+                    ops.append((path, language_id, request))
+    return ops
+
+
+def opened_document(recording: Recording, language_id: str) -> Optional[str]:
+    for entry in recording.server_traffic(language_id):
+        if entry["message"].get("method") == "textDocument/didOpen":
+            return entry["message"]["params"]["textDocument"]["uri"]
+    return None
+
+
+def wait_for(predicate, timeout: float = GATHER_TIMEOUT) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail("timed out after {}s".format(timeout))
+        time.sleep(0.01)
+
+
+OPERATIONS_FOUND = operations()
+
+pytestmark = pytest.mark.skipif(
+    not OPERATIONS_FOUND, reason="no recordings to replay")
+
+latencies: Dict[str, List[float]] = {}
+
+
+@pytest.fixture(scope="module")
+def nvim() -> neovim.Nvim:
+    nvim = neovim.attach("child", argv=[
+        "nvim", "--embed", "--headless", "-n", "-u", rplugin.VIMRC])
+    plugins = rplugin.add_host_paths(nvim)
+    missing = {p for p, _ in OPERATIONS.values()} - set(plugins)
+    if missing:
+        pytest.skip("not in nvim's runtimepath: " + ", ".join(sorted(missing)))
+    yield nvim
+    nvim.quit("qa!")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def report():
+    yield
+    results = {
+        method: {
+            "count": len(samples),
+            "min_ms": min(samples),
+            "median_ms": statistics.median(samples),
+            "max_ms": max(samples),
+        }
+        for method, samples in latencies.items()
+    }
+    print()
+    for method, r in sorted(results.items()):
+        print("{:<28} n {:4d}  min {:8.3f}ms  median {:8.3f}ms  "
+              "max {:8.3f}ms".format(method, r["count"], r["min_ms"],
+                                     r["median_ms"], r["max_ms"]))
+    if REPORT:
+        with open(REPORT, "w") as f:
+            json.dump({"speed": SPEED, "operations": results}, f,
+                      indent=2, sort_keys=True)
+
+
+def start_replay(nvim: neovim.Nvim, recording: str, language_id: str) -> None:
+    commands = nvim.vars.get("LanguageClient_serverCommands") or {}
+    command = [sys.executable, REPLAY_SERVER, "--speed", SPEED,
+               "--language-id", language_id, recording]
+    if commands.get(language_id) == command:
+        return
+    # A new recording starts a new session: the replay server only answers
+    # every recorded request once in order.
+    nvim.command("silent! call LanguageClient#exit()")
+    nvim.command("%bwipeout!")
+    commands[language_id] = command
+    nvim.vars["LanguageClient_serverCommands"] = commands
+
+
+@pytest.mark.parametrize(
+    "recording,language_id,entry", OPERATIONS_FOUND,
+    ids=["{}:{}#{}".format(os.path.basename(path), r["message"]["method"],
+                           r["message"]["id"])
+         for path, _, r in OPERATIONS_FOUND])
+def test_replay(nvim, recording, language_id, entry):
+    start_replay(nvim, recording, language_id)
+
+    message = entry["message"]
+    method = message["method"]
+    params = message.get("params") or {}
+    uri = params.get("textDocument", {}).get("uri") or opened_document(
+        Recording.load(recording), language_id)
+    if uri is None or not os.path.exists(uri_to_path(uri)):
+        pytest.skip("recorded document not found: {}".format(uri))
+
+    nvim.command("edit {}".format(uri_to_path(uri)))
+    nvim.command("setfiletype {}".format(language_id))
+    wait_for(lambda: nvim.funcs.LanguageClient_isServerRunning())
+
+    position = params.get("position") or params.get(
+        "range", {}).get("start") or {"line": 0, "character": 0}
+    nvim.funcs.cursor(position["line"] + 1, position["character"] + 1)
+
+    plugin, name = OPERATIONS[method]
+    source = rplugin.load_source(nvim, plugin, name)
+    if plugin == "denite":
+        context = rplugin.denite_context(nvim, input=params.get("query", ""))
+    else:
+        context = rplugin.deoplete_context(nvim)
+
+    start = time.perf_counter()
+    rplugin.gather(source, context, GATHER_TIMEOUT)
+    elapsed = (time.perf_counter() - start) * 1000
+    latencies.setdefault(method, []).append(elapsed)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Measure the client on a synthetic corpus made with corpus.py: how long
+opening every file of the corpus takes, the end-to-end latency of workspace
+symbols and references, and the memory of the languageclient process.
+
+The corpus is generated into a temporary directory unless --corpus names one
+made beforehand. The language server is corpus_server.py unless
+--server-command gives a real one:
+
+    python3 tests/bench/throughput.py --language rust --files 2000 \\
+        --json rs-2000.json
+    python3 tests/bench/throughput.py --corpus /tmp/corpus-rs \\
+        --server-command rust-analyzer --baseline rs-2000.json
+
+Results are written with --json, and compared to an earlier run with
+--baseline.
+"""
+import argparse
+import json
+import os
+import shlex
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import neovim
+
+import corpus
+import rplugin
+
+
+BENCH_ROOT = os.path.dirname(os.path.abspath(__file__))
+CORPUS_SERVER = os.path.join(BENCH_ROOT, "corpus_server.py")
+
+TIMEOUT = 600
+
+
+def wait_for(predicate: Callable[[], bool], timeout: float = TIMEOUT,
+             interval: float = 0.01) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("timed out after {}s".format(timeout))
+        time.sleep(interval)
+
+
+def summarize(samples: List[float], counts: List[int]) -> Dict[str, Any]:
+    return {
+        "rounds": len(samples),
+        "results": max(counts),
+        "min_ms": min(samples),
+        "median_ms": statistics.median(samples),
+        "max_ms": max(samples),
+    }
+
+
+class Bench:
+    def __init__(self, nvim: neovim.Nvim, root: str,
+                 manifest: Dict[str, Any], stand_in: bool) -> None:
+        self.nvim = nvim
+        self.root = root
+        self.manifest = manifest
+        self.stand_in = stand_in
+        self.plugins = rplugin.add_host_paths(nvim)
+
+    def start(self, command: List[str]) -> float:
+        """Open the entry file and wait for the server, in ms."""
+        self.nvim.command("cd {}".format(
+            self.nvim.funcs.fnameescape(self.root)))
+        self.nvim.vars["LanguageClient_serverCommands"] = {
+            self.manifest["filetype"]: command,
+        }
+        self.nvim.vars["LanguageClient_syncTimeout"] = TIMEOUT
+        start = time.perf_counter()
+        self.edit(self.manifest["entry"])
+        wait_for(lambda: self.nvim.funcs.LanguageClient_isServerRunning())
+        return (time.perf_counter() - start) * 1000
+
+    def edit(self, path: str) -> None:
+        self.nvim.command("edit {}".format(
+            self.nvim.funcs.fnameescape(path)))
+
+    def opened(self) -> int:
+        """Number of documents opened so far."""
+        if self.stand_in:
+            stats = self.nvim.funcs.LanguageClient_runSync(
+                "LanguageClient#Call", "corpus/stats", {})
+            return stats["didOpen"] if stats else 0
+        # Real servers can't tell, count the documents the client sent.
+        state = self.nvim.funcs.LanguageClient_runSync(
+            "LanguageClient#getState")
+        return len(json.loads(state)["text_documents"]) if state else 0
+
+    def did_open_storm(self, count: int) -> Dict[str, Any]:
+        """Open count more files at once and wait for all of them to reach
+        the server."""
+        paths = [self.manifest["shared"]["path"]] + self.manifest["modules"]
+        paths = paths[:count]
+        expected = self.opened() + len(paths)
+        start = time.perf_counter()
+        self.nvim.command(
+            "for f in {} | execute 'edit' fnameescape(f) | endfor".format(
+                json.dumps(paths)))
+        edited = (time.perf_counter() - start) * 1000
+        wait_for(lambda: self.opened() >= expected, interval=0.1)
+        elapsed = (time.perf_counter() - start) * 1000
+        return {
+            "files": len(paths),
+            "edit_ms": edited,
+            "total_ms": elapsed,
+            "files_per_second": len(paths) / elapsed * 1000,
+        }
+
+    def workspace_symbol(self, query: str) -> int:
+        if "denite" in self.plugins:
+            source = rplugin.load_source(self.nvim, "denite",
+                                         "workspaceSymbol")
+            context = rplugin.denite_context(self.nvim, input=query)
+            return len(rplugin.gather(source, context, TIMEOUT))
+        result = self.nvim.funcs.LanguageClient_runSync(
+            "LanguageClient#workspace_symbol", query, {})
+        return len(result or [])
+
+    def references(self) -> int:
+        shared = self.manifest["shared"]
+        self.edit(shared["path"])
+        self.nvim.funcs.cursor(shared["line"] + 1, shared["character"] + 1)
+        if "denite" in self.plugins:
+            source = rplugin.load_source(self.nvim, "denite", "references")
+            context = rplugin.denite_context(self.nvim)
+            return len(rplugin.gather(source, context, TIMEOUT))
+        result = self.nvim.funcs.LanguageClient_runSync(
+            "LanguageClient#textDocument_references", {})
+        return len(result or [])
+
+    def latency(self, operation: Callable[[], int],
+                rounds: int) -> Dict[str, Any]:
+        samples = []
+        counts = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            counts.append(operation())
+            samples.append((time.perf_counter() - start) * 1000)
+        return summarize(samples, counts)
+
+    def memory(self) -> Dict[str, Any]:
+        """Resident memory of the languageclient process, in KiB."""
+        pid = client_pid(self.nvim.funcs.getpid())
+        if pid is None:
+            return {}
+        memory = {}
+        with open("/proc/{}/status".format(pid)) as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    memory[key + "_kb"] = int(value.split()[0])
+        return memory
+
+
+def client_pid(parent: int) -> Optional[int]:
+    """The languageclient child of parent, found through /proc (Linux)."""
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open("/proc/{}/stat".format(pid)) as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # pid (comm) state ppid ...
+        comm = stat[stat.index("(") + 1:stat.rindex(")")]
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        if ppid == parent and comm.startswith("languageclient"):
+            return int(pid)
+    return None
+
+
+def module_prefix(manifest: Dict[str, Any]) -> str:
+    """Query matching the symbols of the last module only."""
+    symbol_name = corpus.LANGUAGES[manifest["language"]].symbol_name
+    return symbol_name(manifest["files"] - 1, 0).rsplit("_", 1)[0] + "_"
+
+
+def run(args: argparse.Namespace, root: str) -> Dict[str, Any]:
+    manifest = corpus.load(root)
+    stand_in = args.server_command is None
+    if stand_in:
+        command = [sys.executable, CORPUS_SERVER, os.path.abspath(root)]
+    else:
+        command = shlex.split(args.server_command)
+
+    nvim = neovim.attach("child", argv=[
+        "nvim", "--embed", "--headless", "-n", "-u", rplugin.VIMRC])
+    try:
+        bench = Bench(nvim, os.path.abspath(root), manifest, stand_in)
+        startup = bench.start(command)
+        storm = bench.did_open_storm(args.storm or manifest["files"] + 1)
+        # A query matching every symbol and one matching a single file.
+        broad = bench.latency(lambda: bench.workspace_symbol(""),
+                              args.rounds)
+        narrow = bench.latency(lambda: bench.workspace_symbol(
+            module_prefix(manifest)), args.rounds)
+        references = bench.latency(bench.references, args.rounds)
+        memory = bench.memory()
+    finally:
+        nvim.quit("qa!")
+
+    return {
+        "corpus": {k: manifest[k] for k in (
+            "language", "files", "symbolsPerFile", "symbols", "seed")},
+        "server": "corpus_server" if stand_in else command[0],
+        "startup_ms": startup,
+        "didOpenStorm": storm,
+        "workspaceSymbol": {"broad": broad, "narrow": narrow},
+        "references": references,
+        "memory": memory,
+    }
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + "."))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    if results["corpus"] != baseline.get("corpus"):
+        print("warning: the baseline was measured on another corpus: {}"
+              .format(baseline.get("corpus")))
+    old = flatten(baseline)
+    for key, value in sorted(flatten(results).items()):
+        if key.startswith("corpus.") or not old.get(key):
+            continue
+        change = (value - old[key]) / old[key] * 100
+        print("{:<40} {:12.3f} -> {:12.3f}  {:+7.1f}%".format(
+            key, old[key], value, change))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="corpus made with corpus.py")
+    parser.add_argument("--language", choices=sorted(corpus.LANGUAGES),
+                        default="rust")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--symbols", type=int, default=100,
+                        help="functions per file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server-command",
+                        help="language server to measure against, "
+                        "corpus_server.py by default")
+    parser.add_argument("--storm", type=int, default=0,
+                        help="files opened at once, all of them by default")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results to compare to")
+    args = parser.parse_args()
+
+    if args.corpus:
+        results = run(args, args.corpus)
+    else:
+        with tempfile.TemporaryDirectory(prefix="corpus-") as root:
+            corpus.generate(args.language, root, args.files, args.symbols,
+                            args.seed)
+            results = run(args, root)
+
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())